@@ -49,6 +49,10 @@ For example, if you like to set the port speed:
 
 Note that there is only one temporary storage for each command.
 """
+import re
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
 from trafficgenerator import TgnError
 
 from ixexplorer.api.tclproto import TclError
@@ -56,6 +60,10 @@ from ixexplorer.api.tclproto import TclError
 FLAG_RDONLY = 1
 FLAG_IGERR = 2
 
+RECORD_CALL = 0
+RECORD_CALL_RC = 1
+RECORD_READ = 2
+
 ixe_obj_auto_set = True
 
 
@@ -67,6 +75,75 @@ class MacStr(object):
         return self.mac.replace(" ", ":")
 
 
+def split_tcl_list(tcl_list: str) -> List[str]:
+    """Split Tcl list string into Python list of strings locally, without round trip to the TclServer.
+
+    Nested lists are returned as strings, call split_tcl_list again to split them.
+
+    :param tcl_list: string representing the Tcl list.
+    """
+    escapes = {"n": "\n", "t": "\t", "r": "\r"}
+    elements = []
+    i = 0
+    length = len(tcl_list)
+    while i < length:
+        while i < length and tcl_list[i].isspace():
+            i += 1
+        if i >= length:
+            break
+        if tcl_list[i] == "{":
+            depth = 1
+            start = i + 1
+            i += 1
+            while i < length and depth:
+                if tcl_list[i] == "\\":
+                    i += 1
+                elif tcl_list[i] == "{":
+                    depth += 1
+                elif tcl_list[i] == "}":
+                    depth -= 1
+                i += 1
+            elements.append(tcl_list[start : i - 1])
+        else:
+            quoted = tcl_list[i] == '"'
+            if quoted:
+                i += 1
+            element = []
+            while i < length and not (tcl_list[i] == '"' if quoted else tcl_list[i].isspace()):
+                if tcl_list[i] == "\\" and i + 1 < length:
+                    i += 1
+                    element.append(escapes.get(tcl_list[i], tcl_list[i]))
+                else:
+                    element.append(tcl_list[i])
+                i += 1
+            if quoted:
+                i += 1
+            elements.append("".join(element))
+    return elements
+
+
+def tcl_quote(value: object) -> str:
+    """Quote value as a single Tcl word (list element), the inverse of split_tcl_list.
+
+    Values with balanced braces and no backslashes are brace quoted, other values are backslash escaped.
+
+    :param value: value to quote, converted to string.
+    """
+    value = str(value)
+    if not value:
+        return "{}"
+    if "\\" not in value:
+        depth = 0
+        for c in value:
+            depth += {"{": 1, "}": -1}.get(c, 0)
+            if depth < 0:
+                break
+        if depth == 0:
+            return "{" + value + "}"
+    escapes = {"\n": "\\n", "\t": "\\t", "\r": "\\r"}
+    return re.sub(r'[\\{}\[\]$";\s]', lambda m: escapes.get(m.group(), "\\" + m.group()), value)
+
+
 class TclMember(object):
     def __init__(self, name, type=str, attrname=None, flags=0, doc=None):
         self.name = name
@@ -87,18 +164,70 @@ class IxTclHalError(Exception):
 class IxTclHalApi:
     def __init__(self, tcl_handler):
         self._tcl_handler = tcl_handler
+        self._recorded = None
 
     def eval(self, cmd, *args):
         return self.call(cmd, *args)
 
     def call(self, cmd, *args):
+        if self._recorded is not None:
+            self._recorded.append((cmd % args, RECORD_CALL))
+            return "0"
         return self._tcl_handler.call(cmd, *args)
 
     def call_rc(self, cmd, *args):
+        if self._recorded is not None:
+            self._recorded.append((cmd % args, RECORD_CALL_RC))
+            return
         rc = self.call(cmd, *args)
         if "error" in rc.lower() or int(rc[-1]) != 0:
             raise IxTclHalError(f"{cmd} {args} - rc = {rc}")
 
+    def call_script(self, body: str, **params: object) -> str:
+        """Run Tcl script in a single round trip to the TclServer.
+
+        The script runs as anonymous procedure (apply) so its variables do not leak into the TclServer global scope.
+        Statements must be separated with ';' as the script is sent as a single line.
+
+        :param body: Tcl script body. The result is the value of the last command (or of explicit return).
+        :param params: script parameters <name, value>, each value is passed to the script as a single Tcl word.
+        """
+        names = " ".join(params)
+        values = " ".join(tcl_quote(v) for v in params.values())
+        script = " ".join(body.split("\n"))
+        return self.call(f"apply {{{{{names}}} {{{script}}}}} {values}".replace("%", "%%"))
+
+    @contextmanager
+    def record(self) -> Iterator[List[Tuple[str, int]]]:
+        """Record calls instead of sending them to the TclServer, run the recorded calls later with call_recorded.
+
+        Recorded calls return "0", so only calls whose result is not used (get, config, set...) should be recorded.
+        Commands that return values can be added to the recorded list as (command, RECORD_READ).
+        """
+        self._recorded = []
+        try:
+            yield self._recorded
+        finally:
+            self._recorded = None
+
+    def call_recorded(self, commands: List[Tuple[str, int]]) -> List[str]:
+        """Run recorded commands in a single round trip to the TclServer.
+
+        :param commands: list of (command, kind) as returned by record.
+        :return: list of the results of all RECORD_READ commands, "-1" for reads that failed.
+        """
+        result = self.call_script(
+            "set r {};"
+            "foreach {c k} $commands {"
+            "if {$k == 2} {if {[catch {eval $c} v]} {set v -1}; lappend r $v; continue};"
+            "set v [eval $c];"
+            'if {$k == 1 && ([string match -nocase *error* $v] || [string index $v end] ne {0})} {error "$c - rc = $v"}'
+            "};"
+            "set r",
+            commands=" ".join("{" + c + "} " + str(k) for c, k in commands),
+        )
+        return split_tcl_list(result)
+
 
 def ixe_obj_meta(name, bases, atts):
     """Dynamically creates properties, which wraps the IxTclHAL API.
@@ -151,6 +280,8 @@ def ixe_obj_meta(name, bases, atts):
 
                 if ixe_obj_auto_set:
                     self.ix_set(m)
+                if self.dirty_scope:
+                    self._set_dirty(self.dirty_scope)
 
             if not m.attrname:
                 m.attrname = m.name
@@ -1,17 +1,32 @@
+import json
 import logging
+import queue
 import time
 from collections import OrderedDict
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 import trafficgenerator.tgn_tcl
 from trafficgenerator import TgnApp, TgnError
 
-from ixexplorer.api.ixapi import FLAG_RDONLY, IxTclHalApi, TclMember, ixe_obj_meta
+from ixexplorer.api.ixapi import FLAG_RDONLY, RECORD_READ, IxTclHalApi, MacStr, TclMember, ixe_obj_meta, split_tcl_list
 from ixexplorer.api.tclproto import TclClient
+from ixexplorer.ixe_capture import IxeCapFileFrame, read_cap_file, write_pcap
 from ixexplorer.ixe_hw import IxeChassis
 from ixexplorer.ixe_object import IxeObject
-from ixexplorer.ixe_port import IxeCapture, IxeCaptureBuffer, IxePhyMode, IxePort, IxeReceiveMode
-from ixexplorer.ixe_statistics_view import IxeCapFileFormat
+from ixexplorer.ixe_port import (
+    IxeCapture,
+    IxeCaptureBuffer,
+    IxeLinkState,
+    IxePhyMode,
+    IxePort,
+    IxePortFeatures,
+    IxeReceiveMode,
+    IxeValidation,
+    StreamWarningsError,
+)
+from ixexplorer.ixe_statistics_view import IxeCapFileFormat, IxeStat
 
 logger = logging.getLogger("tgn.ixexplorer")
 
@@ -32,6 +47,7 @@ class IxeApp(TgnApp):
         trafficgenerator.tgn_tcl.tcl_interp_g = self.api
         self.session = IxeSession(self.logger, self.api)
         self.chassis_chain = {}
+        self.chassis_apis: Dict[str, IxTclHalApi] = {}
 
     @property
     def connected(self):
@@ -49,6 +65,12 @@ class IxeApp(TgnApp):
     def disconnect(self) -> None:
         for chassis in self.chassis_chain.values():
             chassis.disconnect()
+        for api in self.chassis_apis.values():
+            api._tcl_handler.close()
+        self.chassis_apis = {}
+        for api in self.session.worker_apis:
+            api._tcl_handler.close()
+        self.session.worker_apis = []
         self.session.logout()
         self.api._tcl_handler.close()
 
@@ -61,14 +83,214 @@ class IxeApp(TgnApp):
             self.chassis_chain[chassis] = IxeChassis(self.session, chassis)
             self.chassis_chain[chassis].connect()
 
-    def discover(self) -> None:
-        for chassis in self.chassis_chain.values():
-            chassis.discover()
+    def add_chain(self, *chassis: str, discover: bool = True) -> Dict[str, dict]:
+        """Add, connect and discover multiple chassis concurrently, over one TclServer connection per chassis.
 
-    def refresh(self) -> None:
-        for chassis in self.chassis_chain.values():
-            chassis.refresh()
+        Chassis that fail to connect or to discover are not added to the chassis chain, chassis that connected but failed to
+        discover are disconnected.
+
+        :param chassis: chassis IP addresses.
+        :param discover: True - discover chassis after connect, False - only connect.
+        :return: dictionary {chassis: {phase: seconds, error: exception or None}}, per chassis status.
+        """
+        new_chassis = [c for c in chassis if c not in self.chassis_chain]
+        for host in new_chassis:
+            self.chassis_chain[host] = IxeChassis(self.session, host)
+        phases = [("connect", IxeChassis.connect)]
+        if discover:
+            phases.append(("discover", IxeChassis.read_inventory))
+        status, results = self._run_parallel(new_chassis, *phases)
+        for host in new_chassis:
+            if status[host]["error"]:
+                chassis_obj = self.chassis_chain.pop(host)
+                if "connect" in status[host]:
+                    try:
+                        chassis_obj.disconnect(self.chassis_apis.get(host))
+                    except Exception as e:
+                        self.logger.warning(f"Failed to disconnect chassis {host} - {e}")
+                chassis_obj.del_object_from_parent()
+                if host in self.chassis_apis:
+                    self.chassis_apis.pop(host)._tcl_handler.close()
+            elif discover:
+                self.chassis_chain[host].build(results[host])
+        if discover:
+            self.session.port_features.read(*self._chain_ports())
+        return status
+
+    def discover(self, parallel: bool = False) -> Optional[Dict[str, dict]]:
+        """Discover all chassis in chain.
+
+        :param parallel: True - discover chassis concurrently, over one TclServer connection per chassis.
+        :return: if parallel - dictionary {chassis: {phase: seconds, error: exception or None}}, per chassis status.
+        """
+        if not parallel:
+            for chassis in self.chassis_chain.values():
+                chassis.discover()
+            return None
+        status, results = self._run_parallel(list(self.chassis_chain), ("discover", IxeChassis.read_inventory))
+        for host, inventory in results.items():
+            self.chassis_chain[host].build(inventory)
+        self.session.port_features.read(*self._chain_ports())
+        return status
+
+    def refresh(self, parallel: bool = False) -> Optional[Dict[str, dict]]:
+        """Refresh all chassis in chain.
+
+        :param parallel: True - refresh chassis concurrently, over one TclServer connection per chassis.
+        :return: if parallel - dictionary {chassis: {phase: seconds, error: exception or None}}, per chassis status.
+        """
+        status = None
+        if parallel:
+            status, _ = self._run_parallel(
+                list(self.chassis_chain), ("refresh", lambda chassis, api: api.call(f"chassis refresh {chassis.uri}"))
+            )
+        else:
+            for chassis in self.chassis_chain.values():
+                chassis.refresh()
         self.session._reset_current_object()
+        return status
+
+    def save_inventory(self, path: Path) -> None:
+        """Save inventory of all chassis in chain and port features cache to JSON snapshot file.
+
+        :param path: full path to the snapshot file.
+        """
+        snapshot = {
+            "chassis": {
+                host: chassis.inventory if chassis.inventory else chassis.read_inventory()
+                for host, chassis in self.chassis_chain.items()
+            },
+            "port_features": self.session.port_features.types,
+        }
+        with open(path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+
+    def load_inventory(self, path: Path) -> bool:
+        """Build chassis chain objects tree from JSON snapshot file created by save_inventory.
+
+        The snapshot is used only if the fingerprint (server version, cards serial numbers and FPGA versions) of all
+        chassis in chain, read in a single round trip, matches the snapshot. Otherwise, discover all chassis.
+
+        :param path: full path to the snapshot file.
+        :return: True if the snapshot was used, False if chassis were discovered.
+        """
+        if Path(path).exists():
+            with open(path) as f:
+                snapshot = json.load(f)
+            fingerprints = self._read_fingerprints()
+            if list(snapshot["chassis"]) == list(fingerprints) and all(
+                _inventory_fingerprint(snapshot["chassis"][host]) == fingerprint[1:]
+                for host, fingerprint in fingerprints.items()
+            ):
+                self.session.port_features.types.update(snapshot["port_features"])
+                for host, chassis in self.chassis_chain.items():
+                    snapshot["chassis"][host]["id"] = fingerprints[host][0]
+                    chassis.build(snapshot["chassis"][host])
+                return True
+            self.logger.info(f"Inventory snapshot {path} does not match chassis chain")
+        self.discover()
+        return False
+
+    def _chassis_api(self, chassis: str) -> IxTclHalApi:
+        """Return the chassis dedicated TclServer connection, open new connection if needed."""
+        if chassis not in self.chassis_apis:
+            tcl_handler = self.api._tcl_handler
+            api = IxTclHalApi(TclClient(self.logger, tcl_handler.host, tcl_handler.port, tcl_handler.rsa_id))
+            api._tcl_handler.connect()
+            self.chassis_apis[chassis] = api
+        return self.chassis_apis[chassis]
+
+    def _run_parallel(
+        self, chassis: List[str], *phases: Tuple[str, Callable[[IxeChassis, IxTclHalApi], object]]
+    ) -> Tuple[Dict[str, dict], Dict[str, object]]:
+        """Run phases on all chassis concurrently, each chassis over its dedicated TclServer connection.
+
+        Phases of each chassis run in order and stop on the first error. Each phase gets the chassis and its dedicated API,
+        the chassis objects API is not changed so other threads can keep using the chassis.
+
+        :param chassis: chassis IP addresses.
+        :param phases: list of (phase name, IxeChassis method that accepts api).
+        :return: per chassis status {chassis: {phase: seconds, error: exception or None}} and per chassis result of the last
+            phase {chassis: result}.
+        """
+
+        def run_phases(host: str) -> Tuple[dict, object]:
+            chassis_status = OrderedDict(error=None)
+            result = None
+            start = time.time()
+            try:
+                api = self._chassis_api(host)
+                chassis_status["tcl_connect"] = time.time() - start
+                chassis_obj = self.chassis_chain[host]
+                for name, phase in phases:
+                    start = time.time()
+                    result = phase(chassis_obj, api)
+                    chassis_status[name] = time.time() - start
+            except Exception as e:
+                chassis_status["error"] = e
+            self.logger.info(f"Chassis {host} status {dict(chassis_status)}")
+            return chassis_status, result
+
+        status = OrderedDict()
+        results = OrderedDict()
+        if not chassis:
+            return status, results
+        with ThreadPoolExecutor(max_workers=len(chassis)) as executor:
+            for host, (chassis_status, result) in zip(chassis, executor.map(run_phases, chassis)):
+                status[host] = chassis_status
+                if not chassis_status["error"]:
+                    results[host] = result
+        return status, results
+
+    def _chain_ports(self) -> List[IxePort]:
+        return [p for ch in self.chassis_chain.values() for c in ch.cards.values() for p in c.ports.values()]
+
+    def _read_fingerprints(self) -> Dict[str, list]:
+        """Read fingerprint of all chassis in chain in a single round trip.
+
+        :return: dictionary {host: [chassis ID, server version, [[card ID, serial number, FPGA version]]]}.
+        """
+        result = self.api.call_script(
+            "set r {};"
+            "foreach host $hosts {"
+            "chassis get $host; set ch [chassis cget -id]; set n [chassis cget -maxCardCount]; set cards {};"
+            "for {set c 1} {$c <= $n} {incr c} {"
+            "if {[catch {card get $ch $c} rc] || $rc} {continue};"
+            "lappend cards [list $c [card cget -serialNumber] [card cget -fpgaVersion]]"
+            "};"
+            "lappend r [list $ch [chassis cget -ixServerVersion] $cards]"
+            "};"
+            "set r",
+            hosts=" ".join(self.chassis_chain),
+        )
+        IxeChassis.current_object = None
+        fingerprints = {}
+        for host, chassis_result in zip(self.chassis_chain, split_tcl_list(result)):
+            chassis_id, version, cards = split_tcl_list(chassis_result)
+            cards = [split_tcl_list(c) for c in split_tcl_list(cards)]
+            fingerprints[host] = [int(chassis_id), version, [[int(c[0]), c[1], int(c[2])] for c in cards]]
+        return fingerprints
+
+
+def _inventory_fingerprint(inventory: dict) -> list:
+    """Return chassis inventory fingerprint - [server version, [[card ID, serial number, FPGA version]]]."""
+    return [inventory["ixServerVersion"], [[c["id"], c["serialNumber"], c["fpgaVersion"]] for c in inventory["cards"]]]
+
+
+def _spec_value(member: TclMember, value: object) -> object:
+    """Normalize configuration value, either from spec or as returned by cget, for comparison."""
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith("{") and value.endswith("}"):
+            value = value[1:-1].strip()
+    try:
+        if member.type == MacStr:
+            return str(MacStr(str(value))).lower()
+        if member.type is bool:
+            return bool(int(value)) if isinstance(value, str) else bool(value)
+        return member.type(value)
+    except ValueError:
+        return str(value)
 
 
 class IxeSession(IxeObject, metaclass=ixe_obj_meta):
@@ -86,31 +308,279 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
         super().__init__(parent=None, uri="")
         self.logger = logger
         self.api = api
+        self.port_features = IxePortFeatures()
+        self.deferred_validation: Dict[IxePort, None] = OrderedDict()
+        self.worker_apis: List[IxTclHalApi] = []
+        # Incremented whenever statistics are cleared.
+        self.stats_generation = 0
         IxeObject.session = self
 
     def reserve_ports(self, force=False, clear=True) -> None:
         """Reserve ports and reset factory defaults.
 
+        All ports are reserved in a single round trip.
+
         :param force: True - take forcefully, False - fail if port is reserved by other user
         :param clear: True - clear port configuration and statistics, False - leave port as is
         """
-        for port in self.ports.values():
-            port.reserve(force=force)
-            if clear:
-                port.clear()
-                time.sleep(4)
+        self._set_ownership("ixTakeOwnership", force, *self.ports.values())
+        if clear:
+            status = {str(p): s for p, s in self.clear_ports().items() if s}
+            if status:
+                raise TgnError(f"Failed to clear ports {status}")
+            self.wait_for_ready()
+
+    def release_ports(self, *ports: IxePort, force: bool = False) -> None:
+        """Release ports in a single round trip.
+
+        :param ports: list of ports to release, if empty release all ports.
+        :param force: True - release forcefully, False - fail if port is reserved by other user.
+        """
+        self._set_ownership("ixClearOwnership", force, *ports)
+
+    def clear_ports(self, *ports: IxePort, stats: bool = True, phy_mode: IxePhyMode = IxePhyMode.ignore) -> Dict[IxePort, str]:
+        """Reset ports to factory defaults and clear statistics in a single round trip.
+
+        For each port - set factory defaults, set PHY mode, reset, write and clear port statistics. Then clear all
+        statistics (port, streams and packet groups) on all ports.
+
+        :param ports: list of ports to clear, if empty clear all ports.
+        :param stats: True - clear port, streams and packet groups statistics, False - leave statistics.
+        :param phy_mode: requested PHY mode.
+        :return: dictionary {port: error}, empty error if the port was cleared successfully.
+        :raises TgnError: if clearing the statistics failed.
+        """
+        if not ports:
+            ports = self.ports.values()
+        phy_mode = phy_mode.value if isinstance(phy_mode, IxePhyMode) else phy_mode
+        commands = ["port setDefault", "port setFactoryDefaults LOC"]
+        if phy_mode:
+            commands.append(f"port setPhyMode {phy_mode} LOC")
+        commands.extend(["port reset LOC", "port write LOC"])
+        if stats:
+            commands.extend(["stat setDefault", "stat config -enableValidStats true", "stat set LOC", "stat write LOC"])
+        result = self.api.call_script(
+            "set r {};"
+            "foreach l $locations {"
+            "set e {};"
+            "foreach cmd $commands {"
+            "set c [string map [list LOC $l] $cmd];"
+            'if {[catch {eval $c} rc] || ($rc ne {} && $rc ne 0)} {set e "$c - $rc"; break}'
+            "};"
+            "lappend r $e"
+            "};"
+            "set ce {};"
+            "if {$stats} {"
+            "set pl $locations;"
+            "foreach c {ixClearStats ixClearPacketGroups} {"
+            'if {[catch {$c pl} rc] || ($rc ne {} && $rc ne 0)} {set ce "$c - rc = $rc"; break}'
+            "}"
+            "};"
+            "list $r $ce",
+            locations=" ".join("{" + p.uri + "}" for p in ports),
+            commands=" ".join("{" + c + "}" for c in commands),
+            stats=int(stats),
+        )
+        IxeStat.current_object = None
+        if stats:
+            self.stats_generation += 1
+            for port in ports:
+                port.stats_generation += 1
+        errors, clear_error = split_tcl_list(result)
+        status = dict(zip(ports, split_tcl_list(errors)))
+        for port, error in status.items():
+            port._reset_current_object()
+            port.del_objects_by_type("stream")
+            port.loaded_config = None
+            if error:
+                self.logger.error(f"Failed to clear port {port} - {error}")
+            else:
+                port.dirty.clear()
+        if clear_error:
+            raise TgnError(f"Failed to clear statistics - {clear_error}")
+        return status
+
+    def wait_for_ready(self, *ports: IxePort, timeout: int = 4) -> List[IxePort]:
+        """Wait until ports are ready after reset, i.e. link is up, polling the link state of all ports in one round trip.
+
+        Ports that do not get ready (e.g. disconnected ports) are only logged, so in the worst case this method returns
+        after timeout.
+
+        :param ports: list of ports to wait for, if empty wait for all ports.
+        :param timeout: seconds to wait.
+        :return: list of ports that are not ready after timeout.
+        """
+        if not ports:
+            ports = self.ports.values()
+        ready_states = [
+            s.value for s in [IxeLinkState.linkUp, IxeLinkState.linkLoopback, IxeLinkState.forcedLinkUp, IxeLinkState.demoMode]
+        ]
+        not_ready = list(ports)
+        t_end = time.time() + timeout
+        while not_ready:
+            result = self.api.call_script(
+                "set r {}; foreach l $locations {port get {*}$l; lappend r [port cget -linkState]}; set r",
+                locations=" ".join("{" + p.uri + "}" for p in not_ready),
+            )
+            IxePort.current_object = None
+            link_states = split_tcl_list(result)
+            not_ready = [p for p, s in zip(not_ready, link_states) if int(s) not in ready_states]
+            if not not_ready or time.time() > t_end:
+                break
+            time.sleep(0.5)
+        if not_ready:
+            self.logger.warning(f"Ports {[str(p) for p in not_ready]} not ready after {timeout} seconds")
+        return not_ready
+
+    def write_ports(self, *ports: IxePort, validate: IxeValidation = IxeValidation.once, force: bool = False) -> None:
+        """Write configuration of changed ports to chassis in a single round trip.
+
+        Ports with changed port attributes are written with ixWritePortsToHardware. Ports with only changed port objects or
+        streams are written with ixWriteConfigToHardware that does not write PHY configuration. Unchanged ports are not
+        written.
+
+        Changes are tracked by attribute setters, setDefault and the IxePort configuration helpers. Changes made through raw
+        api.call/call_rc are not tracked, write such ports with force=True.
+
+        Raise StreamWarningsError if configuration warnings found.
+
+        :param ports: list of ports to write, duplicates are ignored. If empty write all changed ports.
+        :param validate: none - do not validate, once - validate in the same round trip as the write, deferred - validate
+            later with validate_ports.
+        :param force: True - write all requested ports, unchanged ports are written with ixWritePortsToHardware.
+        """
+        if not ports:
+            ports = self.ports.values()
+        ports = list(OrderedDict.fromkeys(p for p in ports if p.dirty or force))
+        if not ports:
+            return
+        full_ports = [p for p in ports if "port" in p.dirty or not p.dirty]
+        config_ports = [p for p in ports if p.dirty and "port" not in p.dirty]
+        result = self.api.call_script(
+            "if {$full ne {}} {"
+            'set pl $full; set rc [ixWritePortsToHardware pl]; if {$rc} {error "ixWritePortsToHardware $full - rc = $rc"}'
+            "};"
+            "if {$config ne {}} {"
+            "set pl $config; set rc [ixWriteConfigToHardware pl -noVerbose];"
+            ' if {$rc} {error "ixWriteConfigToHardware $config - rc = $rc"}'
+            "};"
+            "set r {};"
+            "if {$validate} {foreach l [concat $full $config] {lappend r [streamRegion generateWarningList {*}$l]}};"
+            "set r",
+            full=" ".join("{" + p.uri + "}" for p in full_ports),
+            config=" ".join("{" + p.uri + "}" for p in config_ports),
+            validate=int(validate == IxeValidation.once),
+        )
+        for port in ports:
+            port.dirty.clear()
+            if validate == IxeValidation.deferred:
+                self.deferred_validation[port] = None
+        stream_warnings = {
+            str(p): [w for w in split_tcl_list(r) if w] for p, r in zip(full_ports + config_ports, split_tcl_list(result))
+        }
+        failed = {p: w for p, w in stream_warnings.items() if w}
+        if failed:
+            raise StreamWarningsError(f"Stream warnings {failed}")
+
+    def validate_ports(self, *ports: IxePort, raise_on_warnings: bool = True) -> Dict[IxePort, List[str]]:
+        """Read stream warnings of list of ports in a single round trip.
+
+        Use after bulk write with IxePort.write(validate=IxeValidation.deferred).
+
+        :param ports: list of ports to validate, if empty validate all ports written with deferred validation.
+        :param raise_on_warnings: True - raise StreamWarningsError if warnings found, False - only return the warnings.
+        :return: dictionary {port: list of warnings}.
+        """
+        if not ports:
+            ports = list(self.deferred_validation)
+        for port in ports:
+            self.deferred_validation.pop(port, None)
+        if not ports:
+            return {}
+        result = self.api.call_script(
+            "set r {}; foreach l $locations {lappend r [streamRegion generateWarningList {*}$l]}; set r",
+            locations=" ".join("{" + p.uri + "}" for p in ports),
+        )
+        stream_warnings = {p: [w for w in split_tcl_list(r) if w] for p, r in zip(ports, split_tcl_list(result))}
+        failed = {str(p): w for p, w in stream_warnings.items() if w}
+        if failed and raise_on_warnings:
+            raise StreamWarningsError(f"Stream warnings {failed}")
+        return stream_warnings
+
+    def apply(
+        self, spec: Dict[Union[str, IxePort], dict], validate: IxeValidation = IxeValidation.once
+    ) -> Dict[str, Dict[str, tuple]]:
+        """Apply declarative configuration, changing only attributes that differ from the current configuration.
+
+        Spec structure:
+        {port: {port attribute: value,
+                "receive_modes": [IxeReceiveMode],
+                port object (packetGroup, dataIntegrity...): {attribute: value},
+                "streams": {stream index: {stream attribute: value,
+                                           stream object (ip, udp, vlan, packetGroup, dataIntegrity...): {attribute: value}}}}}
+
+        The current values of all attributes in the spec are read in a single round trip, changed attributes are set in a
+        single round trip and changed ports are written with write_ports. Applying the same spec again reads the
+        configuration and writes nothing. Missing streams are added, existing streams are not removed.
+
+        Resolving the spec objects is not batched - the first access to each port/stream object (get) and each added
+        stream (stream count read and create) still cost round trips of their own.
+
+        :param spec: requested configuration, ports are port names or port objects.
+        :param validate: validation mode of the write, see write_ports.
+        :return: applied changes {object name: {attribute: (old value, new value)}}.
+        """
+        ports = []
+        requested: Dict[IxeObject, Dict[str, object]] = OrderedDict()
+        for port, port_spec in spec.items():
+            port = port if isinstance(port, IxePort) else self.ports[port]
+            ports.append(port)
+            self._spec_objects(port, port_spec, requested)
+
+        members = {}
+        with self.api.record() as commands:
+            for obj, attributes in requested.items():
+                obj_members = {m.attrname: m for m in obj.__tcl_members__}
+                obj.ix_get(force=True)
+                for attribute in attributes:
+                    if attribute not in obj_members:
+                        raise TgnError(f"{obj.obj_type()} {obj} has no attribute {attribute}")
+                    members[obj, attribute] = obj_members[attribute]
+                    commands.append((f"{obj.__tcl_command__} cget -{obj_members[attribute].name}", RECORD_READ))
+        values = iter(self.api.call_recorded(commands))
+
+        changes: Dict[IxeObject, Dict[str, object]] = OrderedDict()
+        applied: Dict[str, Dict[str, tuple]] = OrderedDict()
+        for obj, attributes in requested.items():
+            for attribute, value in attributes.items():
+                member = members[obj, attribute]
+                current = _spec_value(member, next(values))
+                if current != _spec_value(member, value):
+                    changes.setdefault(obj, OrderedDict())[attribute] = value
+                    applied.setdefault(str(obj), OrderedDict())[attribute] = (current, value)
+
+        if changes:
+            with self.api.record() as commands:
+                for obj, attributes in changes.items():
+                    obj.set_attributes(**attributes)
+            self.api.call_recorded(commands)
+            self.write_ports(*ports, validate=validate)
+        return applied
 
     def add_ports(self, *ports_locations: str) -> Dict[str, IxePort]:
-        """Add ports.
+        """Add ports and read their features.
 
         :param ports_locations: list of ports ports_locations <ip, card, port> to reserve
         """
+        ports = []
         for port_location in ports_locations:
             ip, card, port = port_location.split("/")
             chassis = self.get_objects_with_attribute("chassis", "ipAddress", ip)[0].id
             uri = f"{chassis} {card} {port}"
             port = IxePort(parent=self, uri=uri)
             port._data["name"] = port_location
+            ports.append(port)
+        self.port_features.read(*ports)
         return self.ports
 
     def wait_for_up(self, timeout=16, ports=None):
@@ -152,6 +622,9 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
         port_list = self.set_ports_list(*ports)
         self.api.call_rc("ixClearStats {}".format(port_list))
         self.api.call_rc("ixClearPacketGroups {}".format(port_list))
+        self.stats_generation += 1
+        for port in ports or self.ports.values():
+            port.stats_generation += 1
 
     def start_transmit(self, blocking=False, start_packet_groups=True, *ports):
         """Start transmit on ports.
@@ -211,6 +684,7 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
 
         IxeCapture.current_object = None
         IxeCaptureBuffer.current_object = None
+        IxeCaptureBuffer.loaded = None
         if not ports:
             ports = self.ports.values()
         for port in ports:
@@ -218,41 +692,187 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
         port_list = self.set_ports_list(*ports)
         self.api.call_rc("ixStartCapture {}".format(port_list))
 
-    def stop_capture(self, cap_file_name=None, cap_file_format=IxeCapFileFormat.mem, *ports):
+    def stop_capture(
+        self,
+        cap_file_name=None,
+        cap_file_format=IxeCapFileFormat.mem,
+        *ports,
+        max_workers: int = 8,
+        progress: Optional[Callable[[IxePort, int], None]] = None,
+    ):
         """Stop capture on ports.
 
+        Capture files of all ports are exported concurrently, each port over one of up to max_workers dedicated TclServer
+        connections, with a single round trip per port for TclServer side exports.
+
         :param cap_file_name: prefix for the capture file name.
-            Capture files for each port are saved as individual pcap file named 'prefix' + 'URI'.pcap.
-        :param cap_file_format: exported file format
+            Capture files for each port are saved as individual file named 'prefix' + 'URI'.'format'.
+        :param cap_file_format: exported file format. pcap files are written locally on the client, streaming the frames
+            from the capture buffer, other formats are exported by the TclServer on its file system.
         :param ports: list of ports to stop traffic on, if empty stop all ports.
+        :param max_workers: maximum number of concurrent exports (TclServer connections).
+        :param progress: optional callback called with (port, nPackets) as soon as each port is done.
         :return: dictionary (port, nPackets)
         """
         port_list = self.set_ports_list(*ports)
         self.api.call_rc("ixStopCapture {}".format(port_list))
-
-        nPackets = {}
-        for port in ports if ports else self.ports.values():
-            nPackets[port] = port.capture.nPackets
-            if nPackets[port]:
-                if cap_file_format is not IxeCapFileFormat.mem:
-                    port.cap_file_name = cap_file_name + "-" + port.uri.replace(" ", "_") + "." + cap_file_format.name
-                    port.captureBuffer.export(port.cap_file_name)
-        return nPackets
+        if not ports:
+            ports = list(self.ports.values())
+
+        if cap_file_format is IxeCapFileFormat.mem:
+            result = self.api.call_script(
+                "set r {}; foreach l $locations {capture get {*}$l; lappend r [capture cget -nPackets]}; set r",
+                locations=" ".join("{" + p.uri + "}" for p in ports),
+            )
+            IxeCapture.current_object = None
+            nPackets = OrderedDict((p, int(n)) for p, n in zip(ports, split_tcl_list(result)))
+            for port, n_packets in nPackets.items():
+                port.captureBuffer = IxeCaptureBuffer(port, n_packets)
+                if progress:
+                    progress(port, n_packets)
+            return nPackets
+
+        apis = self._worker_apis(min(len(ports), max_workers))
+
+        def export(port: IxePort) -> int:
+            api = apis.get()
+            try:
+                cap_file = cap_file_name + "-" + port.uri.replace(" ", "_") + "." + cap_file_format.name
+                if cap_file_format is IxeCapFileFormat.pcap:
+                    n_packets = int(api.call_script("capture get {*}$l; capture cget -nPackets", l=port.uri))
+                    capture_buffer = IxeCaptureBuffer(port, n_packets)
+                    capture_buffer.api = api
+                    try:
+                        if n_packets:
+                            write_pcap(Path(cap_file), capture_buffer.read_frames(range(1, n_packets + 1)))
+                    finally:
+                        capture_buffer.api = self.api
+                else:
+                    n_packets = int(
+                        api.call_script(
+                            "capture get {*}$l; set n [capture cget -nPackets];"
+                            "if {$n} {"
+                            'set rc [captureBuffer get {*}$l 1 $n]; if {$rc} {error "captureBuffer get - rc = $rc"};'
+                            'set rc [captureBuffer export $file]; if {$rc} {error "captureBuffer export - rc = $rc"}'
+                            "};"
+                            "set n",
+                            l=port.uri,
+                            file=cap_file,
+                        )
+                    )
+                    capture_buffer = IxeCaptureBuffer(port, n_packets)
+                port.captureBuffer = capture_buffer
+                port.cap_file_name = cap_file if n_packets else None
+                return n_packets
+            finally:
+                apis.put(api)
+
+        nPackets = OrderedDict()
+        try:
+            with ThreadPoolExecutor(max_workers=apis.qsize()) as executor:
+                futures = {executor.submit(export, port): port for port in ports}
+                for future in as_completed(futures):
+                    port = futures[future]
+                    nPackets[port] = future.result()
+                    self.logger.info(f"Capture of port {port} stopped, {nPackets[port]} frames")
+                    if progress:
+                        progress(port, nPackets[port])
+        finally:
+            # Worker connections changed the TclServer capture and captureBuffer storage.
+            IxeCapture.current_object = None
+            IxeCaptureBuffer.current_object = None
+            IxeCaptureBuffer.loaded = None
+        return OrderedDict((p, nPackets[p]) for p in ports)
 
     def get_cap_files(self, *ports):
         """
         :param ports: list of ports to get capture files names for.
-        :return: dictionary (port, capture file)
+        :return: dictionary (port, capture file lines), for binary pcap files the value is the local file path.
         """
         cap_files = {}
         for port in ports:
-            if port.cap_file_name:
+            if port.cap_file_name and port.cap_file_name.endswith("." + IxeCapFileFormat.pcap.name):
+                cap_files[port] = Path(port.cap_file_name)
+            elif port.cap_file_name:
                 with open(port.cap_file_name) as f:
                     cap_files[port] = f.read().splitlines()
             else:
                 cap_files[port] = None
         return cap_files
 
+    def read_cap_files(self, *ports: IxePort) -> Dict[IxePort, Optional[Iterator[IxeCapFileFrame]]]:
+        """Read txt capture files lazily, see ixe_capture.read_cap_file.
+
+        pcap files can be read with any pcap reader and enc files are not supported, so only txt files are read.
+
+        :param ports: list of ports to read capture files for.
+        :return: dictionary (port, generator of frames), None for ports without txt capture file.
+        """
+        txt_suffix = "." + IxeCapFileFormat.txt.name
+        return {
+            p: read_cap_file(Path(p.cap_file_name)) if p.cap_file_name and p.cap_file_name.endswith(txt_suffix) else None
+            for p in ports
+        }
+
+    def _worker_apis(self, number: int) -> "queue.Queue[IxTclHalApi]":
+        """Return queue of number dedicated TclServer connections, open new connections if needed."""
+        tcl_handler = self.api._tcl_handler
+        while len(self.worker_apis) < number:
+            api = IxTclHalApi(TclClient(self.logger, tcl_handler.host, tcl_handler.port, tcl_handler.rsa_id))
+            api._tcl_handler.connect()
+            self.worker_apis.append(api)
+        apis = queue.Queue()
+        for api in self.worker_apis[:number]:
+            apis.put(api)
+        return apis
+
+    def _set_ownership(self, command: str, force: bool, *ports: IxePort) -> Dict[IxePort, str]:
+        """Take or clear ownership of list of ports and read the ports owners in a single round trip.
+
+        :param command: ixTakeOwnership or ixClearOwnership.
+        :param force: True - take/clear forcefully, False - fail if port is reserved by other user.
+        :param ports: list of ports, if empty all ports.
+        :return: dictionary {port: owner} after the operation.
+        """
+        if not ports:
+            ports = self.ports.values()
+        result = self.api.call_script(
+            f"set pl $locations; set rc [{command} pl {{*}}$take_type]; catch {{session get}};"
+            "set owners {}; foreach l $locations {port get {*}$l; lappend owners [port cget -owner]};"
+            "list $rc [session cget -userName] $owners",
+            locations=" ".join("{" + p.uri + "}" for p in ports),
+            take_type="force" if force else "",
+        )
+        IxePort.current_object = None
+        IxeSession.current_object = None
+        rc, user, owners = split_tcl_list(result)
+        owners = dict(zip(ports, [o.strip() for o in split_tcl_list(owners)]))
+        if command == "ixTakeOwnership":
+            failed = {str(p): o for p, o in owners.items() if o != user.strip()}
+        else:
+            failed = {str(p): o for p, o in owners.items() if o}
+        if failed:
+            raise TgnError(f"{command} failed, rc = {rc}, current owners are {failed}")
+        return owners
+
+    def _spec_objects(self, obj: IxeObject, spec: dict, requested: Dict[IxeObject, Dict[str, object]]) -> None:
+        """Resolve the objects in apply spec into requested {object: {attribute: value}}, adding missing streams."""
+        attributes = requested.setdefault(obj, OrderedDict())
+        for key, value in spec.items():
+            if key == "streams":
+                for index, stream_spec in value.items():
+                    while int(index) not in obj.streams:
+                        obj.add_stream()
+                    self._spec_objects(obj.streams[int(index)], stream_spec, requested)
+            elif key == "receive_modes":
+                attributes["receiveMode"] = sum(IxeReceiveMode(m).value for m in value)
+            elif isinstance(value, dict):
+                self._spec_objects(getattr(obj, "_" + key, None) or getattr(obj, key), value, requested)
+            else:
+                attributes[key] = value
+        if not attributes:
+            del requested[obj]
+
     def set_ports_list(self, *ports):
         if not ports:
             ports = self.ports.values()
@@ -299,20 +919,18 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
             modes.append(IxeReceiveMode.widePacketGroup)
             port.packetGroup.groupIdOffset = groupIdOffset
             port.packetGroup.signatureOffset = signatureOffset
-            if sequence_checking and int(port.isValidFeature("portFeatureRxSequenceChecking")):
+            if sequence_checking and port.is_valid_feature("portFeatureRxSequenceChecking"):
                 modes.append(IxeReceiveMode.sequenceChecking)
                 port.packetGroup.sequenceNumberOffset = sequenceNumberOffset
-            if data_integrity and int(port.isValidFeature("portFeatureRxDataIntegrity")):
+            if data_integrity and port.is_valid_feature("portFeatureRxDataIntegrity"):
                 modes.append(IxeReceiveMode.dataIntegrity)
                 port.dataIntegrity.signatureOffset = di_signatureOffset
-            if timestamp and int(port.isValidFeature("portFeatureRxFirstTimeStamp")):
+            if timestamp and port.is_valid_feature("portFeatureRxFirstTimeStamp"):
                 port.dataIntegrity.enableTimeStamp = True
             else:
                 port.dataIntegrity.enableTimeStamp = False
             port.set_receive_modes(*modes)
 
-            port.write()
-
         for port, streams in tx_ports.items():
             for stream in streams:
                 stream.packetGroup.insertSignature = True
@@ -321,7 +939,7 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
                 if sequence_checking:
                     stream.packetGroup.insertSequenceSignature = True
                     stream.packetGroup.sequenceNumberOffset = sequenceNumberOffset
-                if data_integrity and int(port.isValidFeature("portFeatureRxDataIntegrity")):
+                if data_integrity and port.is_valid_feature("portFeatureRxDataIntegrity"):
                     stream.dataIntegrity.insertSignature = True
                     stream.dataIntegrity.signatureOffset = di_signatureOffset
                 if timestamp:
@@ -329,7 +947,7 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
                 else:
                     stream.enableTimestamp = False
 
-            port.write()
+        self.write_ports(*rx_ports, *tx_ports)
 
     def set_prbs(self, rx_ports=None, tx_ports=None):
         """Set TX ports and RX streams for stream statistics.
@@ -352,13 +970,13 @@ class IxeSession(IxeObject, metaclass=ixe_obj_meta):
             port.set_receive_modes(IxeReceiveMode.widePacketGroup, IxeReceiveMode.sequenceChecking, IxeReceiveMode.prbs)
             port.enableAutoDetectInstrumentation = True
             port.autoDetectInstrumentation.ix_set_default()
-            port.write()
 
         for port, streams in tx_ports.items():
             for stream in streams:
                 stream.autoDetectInstrumentation.enableTxAutomaticInstrumentation = True
                 stream.autoDetectInstrumentation.enablePRBS = True
-            port.write()
+
+        self.write_ports(*rx_ports, *tx_ports)
 
     #
     # Properties.
@@ -0,0 +1,147 @@
+"""
+Columnar analysis of captured frames.
+
+Captured frames are bulk loaded into numpy arrays - frame number, timestamp, length, status and the first snap_len bytes
+of each frame - so header fields, inter-arrival times, per flow counts and sequence gaps are computed vectorized.
+
+Header fields are extracted at fixed offsets, the default offsets assume untagged Ethernet II / IPv4 without options.
+"""
+from itertools import islice
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from ixexplorer.ixe_capture import IxeCapFrame
+
+# Default fields offsets and sizes (bytes).
+DA = (0, 6)
+SA = (6, 6)
+ETHER_TYPE = (12, 2)
+IP_PROTOCOL = (23, 1)
+IP_SRC = (26, 4)
+IP_DST = (30, 4)
+L4_SRC_PORT = (34, 2)
+L4_DST_PORT = (36, 2)
+
+
+class IxeCapColumns:
+    """Captured frames as columns."""
+
+    def __init__(self, frames: Iterable[IxeCapFrame], snap_len: int = 128, chunk_size: int = 4096) -> None:
+        """Load frames into columns.
+
+        :param frames: captured frames, typically a generator returned by IxePort.read_cap_frames.
+        :param snap_len: number of bytes to keep from the start of each frame, shorter frames are zero padded.
+        :param chunk_size: number of frames to convert at once.
+        """
+        self.snap_len = snap_len
+        numbers, timestamps, lengths, statuses, headers = [], [], [], [], []
+        frames = iter(frames)
+        while True:
+            chunk = list(islice(frames, chunk_size))
+            if not chunk:
+                break
+            numbers.append(np.fromiter((f.number for f in chunk), dtype=np.int64, count=len(chunk)))
+            timestamps.append(np.fromiter((f.timestamp for f in chunk), dtype=np.int64, count=len(chunk)))
+            lengths.append(np.fromiter((f.length for f in chunk), dtype=np.int32, count=len(chunk)))
+            statuses.append(np.fromiter((f.status for f in chunk), dtype=np.int64, count=len(chunk)))
+            data = b"".join(f.data[:snap_len].ljust(snap_len, b"\0") for f in chunk)
+            headers.append(np.frombuffer(data, dtype=np.uint8).reshape(len(chunk), snap_len))
+        self.number = np.concatenate(numbers) if numbers else np.zeros(0, dtype=np.int64)
+        self.timestamp = np.concatenate(timestamps) if timestamps else np.zeros(0, dtype=np.int64)
+        self.length = np.concatenate(lengths) if lengths else np.zeros(0, dtype=np.int32)
+        self.status = np.concatenate(statuses) if statuses else np.zeros(0, dtype=np.int64)
+        self.headers = np.concatenate(headers) if headers else np.zeros((0, snap_len), dtype=np.uint8)
+
+    @classmethod
+    def from_port(cls, port, frame_nums: Optional[Iterable[int]] = None, snap_len: int = 128) -> "IxeCapColumns":
+        """Load captured frames of port.
+
+        :param port: capturing port.
+        :param frame_nums: frame numbers to load, if None load all captured frames.
+        :param snap_len: number of bytes to keep from the start of each frame.
+        """
+        return cls(port.read_cap_frames(frame_nums), snap_len)
+
+    def __len__(self) -> int:
+        return len(self.number)
+
+    def field(self, offset: int, size: int) -> np.ndarray:
+        """Return big endian unsigned field of up to 8 bytes as array.
+
+        :param offset: field offset in frame.
+        :param size: field size in bytes, 1 to 8.
+        :raises ValueError: if the field size is invalid or the field exceeds the snap length or any frame length.
+        """
+        if not 1 <= size <= 8:
+            raise ValueError(f"Field size {size} must be between 1 and 8 bytes")
+        if offset < 0 or offset + size > self.snap_len:
+            raise ValueError(f"Field {offset}:{offset + size} exceeds snap length {self.snap_len}")
+        short = self.length < offset + size
+        if short.any():
+            raise ValueError(f"Field {offset}:{offset + size} exceeds length of frames {self.number[short][:8].tolist()}")
+        values = np.zeros(len(self), dtype=np.uint64)
+        for i in range(size):
+            values = (values << np.uint64(8)) | self.headers[:, offset + i].astype(np.uint64)
+        return values
+
+    def da(self) -> np.ndarray:
+        return self.field(*DA)
+
+    def sa(self) -> np.ndarray:
+        return self.field(*SA)
+
+    def ether_type(self) -> np.ndarray:
+        return self.field(*ETHER_TYPE)
+
+    def ip_src(self) -> np.ndarray:
+        return self.field(*IP_SRC)
+
+    def ip_dst(self) -> np.ndarray:
+        return self.field(*IP_DST)
+
+    def l4_ports(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self.field(*L4_SRC_PORT), self.field(*L4_DST_PORT)
+
+    def group_id(self, group_id_offset: int, size: int = 4) -> np.ndarray:
+        """Return packet group IDs, group_id_offset is the RX port packetGroup.groupIdOffset."""
+        return self.field(group_id_offset, size)
+
+    def signature(self, signature_offset: int, size: int = 4) -> np.ndarray:
+        """Return packet group signatures, signature_offset is the RX port packetGroup.signatureOffset."""
+        return self.field(signature_offset, size)
+
+    def inter_arrival(self) -> np.ndarray:
+        """Return inter-arrival times (nanoseconds) between consecutive frames."""
+        return np.diff(self.timestamp)
+
+    def flow_counts(self, *fields: Tuple[int, int]) -> Dict[tuple, int]:
+        """Count frames per flow, where flow is the combination of the requested fields.
+
+        :param fields: list of (offset, size) of the flow fields, e.g. flow_counts(IP_SRC, IP_DST).
+        :return: dictionary {(field values): number of frames}.
+        """
+        if not len(self):
+            return {}
+        keys = np.stack([self.field(*f) for f in fields], axis=1)
+        flows, counts = np.unique(keys, axis=0, return_counts=True)
+        return {tuple(int(v) for v in flow): int(count) for flow, count in zip(flows, counts)}
+
+    def sequence_gaps(self, group_id_offset: int, sequence_offset: int) -> Dict[int, np.ndarray]:
+        """Find sequence gaps per packet group, in capture order.
+
+        :param group_id_offset: RX port packetGroup.groupIdOffset.
+        :param sequence_offset: RX port packetGroup.sequenceNumberOffset.
+        :return: dictionary {group ID: array of frame numbers where sequence number is not previous + 1}.
+        """
+        group_ids = self.group_id(group_id_offset)
+        sequences = self.field(sequence_offset, 4).astype(np.int64)
+        order = np.lexsort((np.arange(len(self)), group_ids))
+        group_ids, sequences, numbers = group_ids[order], sequences[order], self.number[order]
+        gaps = (np.diff(sequences) != 1) & (group_ids[1:] == group_ids[:-1])
+        gap_groups = group_ids[1:][gaps]
+        gap_numbers = numbers[1:][gaps]
+        groups = np.unique(group_ids)
+        # Gaps are sorted by group, so each group gaps are a slice, split at the first gap of each next group.
+        per_group = np.split(gap_numbers, np.searchsorted(gap_groups, groups[1:]))
+        return dict(zip(groups.tolist(), per_group))
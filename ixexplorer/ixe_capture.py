@@ -0,0 +1,159 @@
+"""
+Local capture files handling.
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+# pcap global header - nanosecond resolution magic, version 2.4, UTC, sigfigs, snaplen, link type.
+PCAP_MAGIC_NS = 0xA1B23C4D
+PCAP_SNAPLEN = 0x40000
+PCAP_LINKTYPE_ETHERNET = 1
+
+_pcap_header = struct.Struct("<IHHiIII")
+_pcap_record_header = struct.Struct("<IIII")
+
+
+class IxeCapFrame(NamedTuple):
+    """Captured frame - frame number, timestamp (nanoseconds), length, status and frame data."""
+
+    number: int
+    timestamp: int
+    length: int
+    status: int
+    data: bytes
+
+
+class IxeCapFileFrame(NamedTuple):
+    """Frame read from capture file - frame index, timestamp (nanoseconds, None if not parsable), length and frame data."""
+
+    index: int
+    timestamp: Optional[int]
+    length: int
+    data: bytes
+
+
+def write_pcap(pcap_file: Path, frames: Iterable[IxeCapFrame], link_type: int = PCAP_LINKTYPE_ETHERNET) -> int:
+    """Write frames into pcap file with nanosecond timestamps.
+
+    Frames are written as they are consumed, so memory usage does not depend on the number of frames.
+
+    :param pcap_file: pcap file path.
+    :param frames: frames to write, typically a generator returned by IxePort.read_cap_frames.
+    :param link_type: pcap link type.
+    :return: number of frames written.
+    """
+    written = 0
+    with open(pcap_file, "wb") as f:
+        f.write(_pcap_header.pack(PCAP_MAGIC_NS, 2, 4, 0, 0, PCAP_SNAPLEN, link_type))
+        for frame in frames:
+            seconds, nanoseconds = divmod(frame.timestamp, 1_000_000_000)
+            data = frame.data[:PCAP_SNAPLEN]
+            f.write(_pcap_record_header.pack(seconds, nanoseconds, len(data), max(frame.length, len(frame.data))))
+            f.write(data)
+            written += 1
+    return written
+
+
+def read_cap_file(cap_file: Path, batch_size: int = 4096) -> Iterator[IxeCapFileFrame]:
+    """Read IxExplorer txt capture export lazily.
+
+    The file is memory mapped and parsed line by line, the hex data of each batch of frames is decoded with a single
+    bytes.fromhex call, so memory usage does not depend on the file size.
+
+    The txt export is a tab separated table with header line. The frame number, time stamp, length and status columns
+    are identified by their header names, all other columns (DA, SA, type, data...) are hex bytes values that are
+    concatenated, in order, into the frame data.
+
+    enc exports use proprietary binary encoding and are not supported.
+
+    :param cap_file: capture file path.
+    :param batch_size: number of frames to decode at once.
+    :return: generator of frames.
+    :raises ValueError: if the capture file is not txt file, raised immediately and not when the frames are consumed.
+    """
+    cap_file = Path(cap_file)
+    if cap_file.suffix != ".txt":
+        raise ValueError(f"Capture file type {cap_file.suffix} not supported.")
+    return _read_cap_file(cap_file, batch_size)
+
+
+def _read_cap_file(cap_file: Path, batch_size: int) -> Iterator[IxeCapFileFrame]:
+    with open(cap_file, "rb") as f:
+        if not cap_file.stat().st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            columns: Optional[Dict[str, object]] = None
+            batch = []
+            for line in iter(mm.readline, b""):
+                fields = line.rstrip(b"\r\n").split(b"\t")
+                if not fields[0].strip():
+                    continue
+                if columns is None:
+                    if fields[0].strip().isdigit():
+                        raise ValueError(f"Capture file {cap_file} has no header line.")
+                    columns = _cap_file_columns([h.strip().lower() for h in fields])
+                    continue
+                batch.append(fields)
+                if len(batch) >= batch_size:
+                    yield from _decode_cap_file_frames(batch, columns)
+                    batch = []
+            if batch:
+                yield from _decode_cap_file_frames(batch, columns)
+
+
+def _cap_file_columns(header: List[bytes]) -> Dict[str, object]:
+    """Identify capture file columns from the header, all columns except number, time stamp, length and status are data."""
+
+    def find(*names: bytes) -> Optional[int]:
+        for i, h in enumerate(header):
+            if any(n in h for n in names):
+                return i
+        return None
+
+    index = find(b"frame", b"number", b"no.", b"index")
+    index = 0 if index is None else index
+    timestamp = find(b"time")
+    length = find(b"length")
+    if length is not None and b"type" in header[length]:
+        length = next((i for i, h in enumerate(header) if b"length" in h and b"type" not in h), None)
+    status = find(b"status")
+    special = {index, timestamp, length, status}
+    data = [i for i in range(len(header)) if i not in special]
+    return {"index": index, "timestamp": timestamp, "length": length, "data": data}
+
+
+def _decode_cap_file_frames(batch: List[List[bytes]], columns: Dict[str, object]) -> Iterator[IxeCapFileFrame]:
+    """Decode batch of capture file lines, all hex frames data at once."""
+    tokens = [[t for i in columns["data"] if i < len(fields) for t in fields[i].split()] for fields in batch]
+    data = memoryview(bytes.fromhex(b" ".join(t for frame_tokens in tokens for t in frame_tokens).decode()))
+    offset = 0
+    for fields, frame_tokens in zip(batch, tokens):
+        size = len(frame_tokens)
+        frame = data[offset : offset + size].tobytes()
+        offset += size
+        length = columns["length"]
+        timestamp = columns["timestamp"]
+        yield IxeCapFileFrame(
+            int(fields[columns["index"]]),
+            _parse_timestamp(fields[timestamp].strip().decode()) if timestamp is not None else None,
+            int(fields[length]) if length is not None and fields[length].strip().isdigit() else len(frame),
+            frame,
+        )
+
+
+def _parse_timestamp(timestamp: str) -> Optional[int]:
+    """Parse capture file time stamp (nanoseconds or [[H:]M:]S[.fraction[.fraction...]]) into nanoseconds."""
+    try:
+        if timestamp.isdigit():
+            return int(timestamp)
+        *hours_minutes, seconds = timestamp.split(":")
+        seconds, *fractions = seconds.split(".")
+        total = 0
+        for value in [*hours_minutes, seconds]:
+            total = total * 60 + int(value)
+        fraction = "".join(fractions)[:9].ljust(9, "0")
+        return total * 1_000_000_000 + int(fraction)
+    except ValueError:
+        return None
@@ -4,11 +4,9 @@ Port class in in ixe_port module.
 """
 import re
 from collections import OrderedDict
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, Optional
 
-from trafficgenerator.tgn_tcl import tcl_list_2_py_list
-
-from ixexplorer.api.ixapi import FLAG_RDONLY, IxTclHalError, TclMember, ixe_obj_meta
+from ixexplorer.api.ixapi import FLAG_RDONLY, IxTclHalApi, IxTclHalError, TclMember, ixe_obj_meta, split_tcl_list
 from ixexplorer.ixe_object import IxeObject, IxeObjectObj
 from ixexplorer.ixe_port import IxePort
 
@@ -45,31 +43,46 @@ class IxeCard(IxeObject, metaclass=ixe_obj_meta):
         for pid in range(1, self.portCount + 1):
             IxePort(self, self.uri + "/" + str(pid))
         try:
-            rg_info_list = tcl_list_2_py_list(self.resourceGroupInfoList, within_tcl_str=True)
-            for entry in rg_info_list:
-                matches = re.finditer(self.regex, entry.strip())
-                for match in matches:
-                    IxeResourceGroup(
-                        self,
-                        str(int(match.group(1)) + 1),
-                        match.group(2),
-                        match.group(3),
-                        [int(p) for p in match.group(4).strip().split()],
-                        [int(p) for p in match.group(5).strip().split()],
-                        [int(p) for p in match.group(6).strip().split()],
-                    )
+            self._add_resource_groups(self.resourceGroupInfoList)
             if self.type == 110:
-                operationMode = self.operationMode
-                if operationMode == 2:
-                    ports = [13]
-                    operationMode = "10000"
-                else:
-                    ports = range(1, 13)
-                    operationMode = "1000"
-                IxeResourceGroup(self, 1, operationMode, -1, ports, ports, ports)
+                self._add_operation_mode_group(self.operationMode)
         except Exception:
             print("no resource group support")
 
+    def build(self, inventory: dict) -> None:
+        """Build card ports and resource groups from inventory read by IxeChassis.read_inventory, without round trips.
+
+        :param inventory: card inventory.
+        """
+        self.logger.info("Build card {}".format(self.obj_name()))
+        for pid, port_type in enumerate(inventory["portTypes"], start=1):
+            port = IxePort(self, self.uri + "/" + str(pid))
+            port.port_type = port_type if port_type else None
+        self._add_resource_groups(inventory["resourceGroupInfoList"])
+        if inventory["type"] == 110:
+            self._add_operation_mode_group(inventory["operationMode"])
+
+    def _add_resource_groups(self, rg_info_list: str) -> None:
+        for match in re.finditer(self.regex, rg_info_list):
+            IxeResourceGroup(
+                self,
+                str(int(match.group(1)) + 1),
+                match.group(2),
+                match.group(3),
+                [int(p) for p in match.group(4).strip().split()],
+                [int(p) for p in match.group(5).strip().split()],
+                [int(p) for p in match.group(6).strip().split()],
+            )
+
+    def _add_operation_mode_group(self, operationMode: int) -> None:
+        if operationMode == 2:
+            ports = [13]
+            operationMode = "10000"
+        else:
+            ports = range(1, 13)
+            operationMode = "1000"
+        IxeResourceGroup(self, "1", operationMode, -1, ports, ports, ports)
+
     def add_vm_port(self, port_id, nic_id, mac, promiscuous=0, mtu=1500, speed=1000):
         card_id = self._card_id()
         self._api.call_rc(
@@ -213,19 +226,37 @@ class IxeChassis(IxeObject, metaclass=ixe_obj_meta):
         """Create IxeChassis object with name = url == IP address."""
         super().__init__(parent=parent, uri=host, name=host)
         self.chassis_id = 0
+        self.inventory = None
 
-    def connect(self) -> None:
+    def connect(self, api: Optional[IxTclHalApi] = None) -> None:
         """Connect to chassis and get assigned chassis ID.
 
         Note that sometimes, randomly, ixConnectToChassis fails. However, using chassis.add also fails, so it seems there is
         no advantage for using one over the other.
+
+        Connect and chassis ID read are done in a single round trip so chassis can be connected concurrently over different
+        TclServer connections.
+
+        :param api: TclServer connection to use, if None - the chassis API.
         """
-        self.api.call_rc(f"ixConnectToChassis {self.uri}")
-        self.chassis_id = self.id
+        rc, chassis_id = split_tcl_list(
+            (api or self.api).call_script(
+                "set rc [ixConnectToChassis $host]; if {$rc} {return $rc}; chassis get $host; list $rc [chassis cget -id]",
+                host=self.uri,
+            )
+            + " 0"
+        )[:2]
+        if int(rc):
+            raise IxTclHalError(f"ixConnectToChassis {self.uri} - rc = {rc}")
+        IxeChassis.current_object = None
+        self.chassis_id = int(chassis_id)
+
+    def disconnect(self, api: Optional[IxTclHalApi] = None) -> None:
+        """Disconnect from chassis.
 
-    def disconnect(self) -> None:
-        """Disconnect from chassis."""
-        self.api.call_rc(f"ixDisconnectFromChassis {self.uri}")
+        :param api: TclServer connection to use, if None - the chassis API.
+        """
+        (api or self.api).call_rc(f"ixDisconnectFromChassis {self.uri}")
 
     def add_card(self, cid):
         """Add card.
@@ -241,9 +272,73 @@ class IxeChassis(IxeObject, metaclass=ixe_obj_meta):
             card.del_object_from_parent()
 
     def discover(self) -> None:
+        """Discover chassis cards, ports and resource groups in a single round trip."""
         self.logger.info("Discover chassis {}".format(self.obj_name()))
+        self.build(self.read_inventory())
+        self.session.port_features.read(*[p for c in self.cards.values() for p in c.ports.values()])
+
+    def discover_slots(self) -> None:
+        """Discover chassis cards slot by slot (multiple round trips per slot)."""
+        self.logger.info("Discover chassis {} slots".format(self.obj_name()))
         for cid in range(1, self.maxCardCount + 1):
             self.add_card(cid)
+        self.session.port_features.read(*[p for c in self.cards.values() for p in c.ports.values()])
+
+    def read_inventory(self, api: Optional[IxTclHalApi] = None) -> dict:
+        """Read full chassis inventory - cards, ports and resource groups - in a single round trip.
+
+        :param api: TclServer connection to use, if None - the chassis API.
+        :return: chassis inventory dictionary {id, ixServerVersion, cards: [card inventory]}.
+        """
+        result = (api or self.api).call_script(
+            "chassis get $host; set ch [chassis cget -id]; set n [chassis cget -maxCardCount];"
+            "set cards {};"
+            "for {set c 1} {$c <= $n} {incr c} {"
+            "if {[catch {card get $ch $c} rc] || $rc} {continue};"
+            "if {[catch {card cget -resourceGroupInfoList} rg]} {set rg {}};"
+            "if {[catch {card cget -operationMode} om]} {set om 0};"
+            "set pt {};"
+            "for {set p 1} {$p <= [card cget -portCount]} {incr p} {"
+            "if {[catch {port get $ch $c $p} rc] || $rc} {lappend pt {}} else {lappend pt [port cget -type]}"
+            "};"
+            "lappend cards [list $c [card cget -type] [card cget -typeName] $om $rg [card cget -serialNumber]"
+            " [card cget -fpgaVersion] $pt]"
+            "};"
+            "list $ch [chassis cget -ixServerVersion] $cards",
+            host=self.uri,
+        )
+        IxeChassis.current_object = None
+        IxeCard.current_object = None
+        IxePort.current_object = None
+        chassis_id, version, cards = split_tcl_list(result)
+        inventory = {"id": int(chassis_id), "ixServerVersion": version, "cards": []}
+        for card in split_tcl_list(cards):
+            cid, card_type, type_name, operation_mode, rg_info_list, serial_number, fpga_version, port_types = split_tcl_list(
+                card
+            )
+            inventory["cards"].append(
+                {
+                    "id": int(cid),
+                    "type": int(card_type),
+                    "typeName": type_name,
+                    "operationMode": int(operation_mode),
+                    "resourceGroupInfoList": rg_info_list,
+                    "serialNumber": serial_number,
+                    "fpgaVersion": int(fpga_version),
+                    "portTypes": split_tcl_list(port_types),
+                }
+            )
+        return inventory
+
+    def build(self, inventory: dict) -> None:
+        """Build chassis cards, ports and resource groups from inventory, without round trips.
+
+        :param inventory: chassis inventory as returned by read_inventory.
+        """
+        self.chassis_id = inventory["id"]
+        self.inventory = inventory
+        for card_inventory in inventory["cards"]:
+            IxeCard(self, str(self.chassis_id) + "/" + str(card_inventory["id"])).build(card_inventory)
 
     def add_vm_card(self, card_ip, card_id, keep_alive=300):
         self._api.call_rc("chassis addVirtualCard {} {} {} {}".format(self.host, card_ip, card_id, keep_alive))
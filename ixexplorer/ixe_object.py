@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
 
 from trafficgenerator.tgn_object import TgnObject
 
@@ -13,6 +13,10 @@ class IxeObject(TgnObject, metaclass=ixe_obj_meta):
     __get_command__ = "get"
     __set_command__ = "set"
 
+    # Dirty scope of changes of the object attributes, see _set_dirty. None for objects that are not written with the port
+    # configuration (statistics, read only objects).
+    dirty_scope: Optional[str] = "config"
+
     def __init__(self, parent, **data):
         data["objRef"] = self.__tcl_command__ + " " + str(data["uri"])
         super().__init__(parent=parent, objType=self.__tcl_command__, **data)
@@ -41,6 +45,8 @@ class IxeObject(TgnObject, metaclass=ixe_obj_meta):
     def ix_set_default(self) -> None:
         self.api.call("{} setDefault".format(self.__tcl_command__))
         self.__class__.current_object = self
+        if self.dirty_scope:
+            self._set_dirty(self.dirty_scope)
 
     def ix_get(self, member=None, force=False) -> None:
         if (self != self.__class__.current_object or force) and self.__get_command__:
@@ -87,6 +93,14 @@ class IxeObject(TgnObject, metaclass=ixe_obj_meta):
         global ixe_obj_auto_set
         ixe_obj_auto_set = auto_set
 
+    def _set_dirty(self, scope: str = "config") -> None:
+        """Mark the owning port as changed since last write to hardware.
+
+        :param scope: port - port attributes changed (full port write), config - port objects or streams changed.
+        """
+        if isinstance(self.parent, IxeObject):
+            self.parent._set_dirty(scope)
+
     def _reset_current_object(self) -> None:
         self.__class__.current_object = None
         for child in self.objects.values():
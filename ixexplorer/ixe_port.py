@@ -1,10 +1,15 @@
+import hashlib
+import json
 import re
+from collections import OrderedDict
 from enum import Enum
 from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 from trafficgenerator import TgnError
 
-from ixexplorer.api.ixapi import FLAG_IGERR, FLAG_RDONLY, MacStr, TclMember, ixe_obj_meta
+from ixexplorer.api.ixapi import FLAG_IGERR, FLAG_RDONLY, MacStr, TclMember, ixe_obj_meta, split_tcl_list
+from ixexplorer.ixe_capture import IxeCapFrame, write_pcap
 from ixexplorer.ixe_object import IxeObject, IxeObjectObj
 from ixexplorer.ixe_statistics_view import IxeCapFileFormat, IxePortsStats, IxeStat, IxeStreamsStats
 from ixexplorer.ixe_stream import IxeStream
@@ -70,10 +75,110 @@ class IxeLinkState(Enum):
     ethernetOamLoopback = 54
 
 
+class IxeValidation(Enum):
+    """Stream warnings validation mode of port write."""
+
+    none = "none"
+    once = "once"
+    deferred = "deferred"
+
+
 class StreamWarningsError(TgnError):
     pass
 
 
+class IxePortFeatures:
+    """Cache of port features keyed by port type.
+
+    Features are fixed per port type so they are read once per type, for all requested ports in a single round trip. The
+    cache can be saved to file and loaded in later runs so only the port types are read.
+    """
+
+    valid_features = [
+        "portFeatureLocalCPU",
+        "portFeaturePrbs",
+        "portFeatureRxDataIntegrity",
+        "portFeatureRxFirstTimeStamp",
+        "portFeatureRxLatencyBin",
+        "portFeatureRxPacketGroups",
+        "portFeatureRxSequenceChecking",
+        "portFeatureRxTimeBin",
+        "portFeatureRxWidePacketGroups",
+        "portFeatureTxRxSyncStats",
+    ]
+    features = ["ethernetLineRate"]
+
+    def __init__(self) -> None:
+        self.types: Dict[str, Dict[str, dict]] = {}
+
+    def read(self, *ports: "IxePort") -> None:
+        """Read ports types and all features of new port types in a single round trip.
+
+        :param ports: list of ports to read types and features for.
+        """
+        ports = [p for p in ports if p.port_type is None or p.port_type not in self.types]
+        if not ports:
+            return
+        result = ports[0].api.call_script(
+            "set r {};"
+            "foreach {c l p} $locations {"
+            "port get $c $l $p; set t [port cget -type]; set v {}; set g {};"
+            "if {[lsearch -exact $known $t] < 0} {"
+            "lappend known $t;"
+            "foreach f $valid_features {if {[catch {port isValidFeature $c $l $p $f} rc]} {set rc 0}; lappend v $rc};"
+            "foreach f $features {if {[catch {port getFeature $c $l $p $f} rc]} {set rc {}}; lappend g $rc}"
+            "};"
+            "lappend r [list $t $v $g]"
+            "};"
+            "set r",
+            locations=" ".join(p.uri for p in ports),
+            known=" ".join("{" + t + "}" for t in self.types),
+            valid_features=" ".join(self.valid_features),
+            features=" ".join(self.features),
+        )
+        IxePort.current_object = None
+        for port, port_result in zip(ports, split_tcl_list(result)):
+            port_type, valid, features = split_tcl_list(port_result)
+            port.port_type = port_type
+            if valid:
+                self.types[port_type] = {
+                    "valid": {f: bool(int(v)) for f, v in zip(self.valid_features, split_tcl_list(valid))},
+                    "features": dict(zip(self.features, split_tcl_list(features))),
+                }
+
+    def is_valid_feature(self, port: "IxePort", feature: str) -> bool:
+        """Return True if the feature is valid for the port, read the feature from the port only if not cached."""
+        self.read(port)
+        valid = self.types.setdefault(port.port_type, {"valid": {}, "features": {}})["valid"]
+        if feature not in valid:
+            valid[feature] = bool(int(port.isValidFeature(feature)))
+        return valid[feature]
+
+    def get_feature(self, port: "IxePort", feature: str) -> str:
+        """Return port feature value, read the feature from the port only if not cached."""
+        self.read(port)
+        features = self.types.setdefault(port.port_type, {"valid": {}, "features": {}})["features"]
+        if feature not in features:
+            features[feature] = port.getFeature(feature)
+        return features[feature]
+
+    def save(self, path: Path) -> None:
+        """Save port features cache to JSON file.
+
+        :param path: full path to the cache file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.types, f, indent=1)
+
+    def load(self, path: Path) -> None:
+        """Load port features cache from JSON file created by save.
+
+        :param path: full path to the cache file.
+        """
+        with open(path) as f:
+            self.types.update(json.load(f))
+
+
 class IxePort(IxeObject, metaclass=ixe_obj_meta):
     __tcl_command__ = "port"
     __tcl_members__ = [
@@ -133,6 +238,7 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
         TclMember("enableRsFec", type=bool),
         TclMember("ieeeL1Defaults", type=int),
     ]
+    dirty_scope = "port"
 
     __tcl_commands__ = [
         "export",
@@ -164,11 +270,16 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
     def __init__(self, parent, uri):
         super().__init__(parent=parent, uri=uri.replace("/", " "))
         self.cap_file_name = None
+        self.port_type = None
+        self.dirty = set()
+        self.loaded_config = None
+        # Incremented whenever the port statistics are cleared.
+        self.stats_generation = 0
 
     def supported_speeds(self):
         # todo FIX  once parent is Session(by reserve_ports) - no active_ports ,only if parent is card(by discover)!!!
         # if self.parent.active_ports == self.parent.ports:
-        supported_speeds = re.findall(r"\d+", self.getFeature("ethernetLineRate"))
+        supported_speeds = re.findall(r"\d+", self.get_feature("ethernetLineRate"))
         # Either active_ports != self.parent.ports or empty supported speeds for whatever reason...
         if not supported_speeds:
             for rg in self.parent.resource_groups.values():
@@ -204,45 +315,80 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
             except Exception:
                 raise TgnError(f"Failed to clear ownership for port {self} current owner is {self.owner}")
 
-    def write(self) -> None:
+    def write(self, validate: IxeValidation = IxeValidation.once) -> None:
         """Write configuration to chassis.
 
         Raise StreamWarningsError if configuration warnings found.
+
+        :param validate: none - do not validate, once - validate in the same round trip as the write, deferred - validate
+            later together with all other deferred ports with IxeSession.validate_ports.
         """
-        self.ix_command("write")
-        stream_warnings = self.streamRegion.generateWarningList()
-        warnings_list = (
-            self.api.call("join " + " {" + stream_warnings + "} " + " LiStSeP").split("LiStSeP")
-            if self.streamRegion.generateWarningList()
-            else []
-        )
-        for warning in warnings_list:
-            if warning:
-                raise StreamWarningsError(warning)
+        if validate == IxeValidation.once:
+            stream_warnings = self.api.call_script(
+                "port write {*}$location; streamRegion generateWarningList {*}$location", location=self.uri
+            )
+            self.dirty.clear()
+            for warning in split_tcl_list(stream_warnings):
+                if warning:
+                    raise StreamWarningsError(warning)
+        else:
+            self.ix_command("write")
+            self.dirty.clear()
+            if validate == IxeValidation.deferred:
+                self.session.deferred_validation[self] = None
 
     def clear(self, stats: bool = True, phy_mode: IxePhyMode = IxePhyMode.ignore) -> None:
-        self.ix_set_default()
-        self.setFactoryDefaults()
-        self.set_phy_mode(phy_mode)
-        self.reset()
-        self.write()
-        if stats:
-            self.clear_port_stats()
-            self.clear_all_stats()
-            self.del_objects_by_type("stream")
+        """Reset port to factory defaults and clear statistics in a single round trip.
 
-    def load_config(self, config_file: Path) -> None:
+        :param stats: True - clear port, streams and packet groups statistics, False - leave statistics.
+        :param phy_mode: requested PHY mode.
+        """
+        status = self.session.clear_ports(self, stats=stats, phy_mode=phy_mode)[self]
+        if status:
+            raise TgnError(f"Failed to clear port {self} - {status}")
+
+    def is_valid_feature(self, feature: str) -> bool:
+        """Return True if feature is valid for the port.
+
+        Unlike isValidFeature, the feature is read from the session port features cache.
+
+        :param feature: feature name (portFeature*).
+        """
+        return self.session.port_features.is_valid_feature(self, feature)
+
+    def get_feature(self, feature: str) -> str:
+        """Return port feature value.
+
+        Unlike getFeature, the feature is read from the session port features cache.
+
+        :param feature: feature name.
+        """
+        return self.session.port_features.get_feature(self, feature)
+
+    def load_config(self, config_file: Path, force: bool = False) -> None:
         """Load configuration file from prt or str.
 
         Configuration file type is extracted from the file suffix - prt or str.
 
+        If the port still holds the same configuration (same file content) loaded by this session and was not changed since
+        (no attribute set, clear or reset) the import, write and discover are skipped. The content is hashed only when the
+        file is accessible from the client, otherwise the configuration is always loaded.
+
         :TODO: Investigate why port import can only import files that were exported with port export, not from File -> export.
 
         :param config_file: full path to the configuration file.
             IxTclServer must have access to the file location. either:
                 The config file is on shared folder.
                 IxTclServer run on the client machine.
+        :param force: True - always load the configuration, False - skip load if the port holds the same configuration.
         """
+        try:
+            digest = hashlib.sha256(Path(config_file).read_bytes()).hexdigest()
+        except OSError:
+            digest = None
+        if not force and digest and digest == self.loaded_config and not self.dirty:
+            self.logger.debug(f"Port {self} already holds {config_file}, skip load")
+            return
         ext = config_file.suffix
         if ext == ".prt":
             self.api.call_rc(f'port import "{config_file}" {self.uri}')
@@ -253,6 +399,7 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
             raise ValueError(f"Configuration file type {ext} not supported.")
         self.write()
         self.discover()
+        self.loaded_config = digest
 
     def save_config(self, config_file: Path) -> None:
         """Save configuration file from prt or str.
@@ -312,19 +459,35 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
     def get_cap_file(self):
         return self.session.get_cap_files(self)[self]
 
+    def save_cap_pcap(self, pcap_file: Path, reply_budget: Optional[int] = None) -> int:
+        """Save captured frames into local pcap file, streaming the frames from the capture buffer in chunks.
+
+        :param pcap_file: local pcap file path.
+        :param reply_budget: approximate maximum size, in bytes, of each TclServer reply.
+        :return: number of frames written.
+        """
+        return write_pcap(pcap_file, self.read_cap_frames(reply_budget=reply_budget))
+
     def get_cap_frames(self, *frame_nums):
-        """Stop capture on ports.
+        """Get captured frames as hex strings, in bulk round trips.
 
         :param frame_nums: list of frame numbers to read.
-        :return: list of captured frames.
+        :return: list of captured frames, None for frames that could not be read.
         """
-        frames = []
-        for frame_num in frame_nums:
-            if self.captureBuffer.getframe(frame_num) == "0":
-                frames.append(self.captureBuffer.frame)
-            else:
-                frames.append(None)
-        return frames
+        return [f[3] if f else None for _, f in self.captureBuffer.read_raw_frames(frame_nums)]
+
+    def read_cap_frames(
+        self, frame_nums: Optional[Iterable[int]] = None, reply_budget: Optional[int] = None
+    ) -> Iterator[IxeCapFrame]:
+        """Read captured frames with data, timestamp, length and status in bulk round trips.
+
+        :param frame_nums: frame numbers to read, if None read all captured frames.
+        :param reply_budget: approximate maximum size, in bytes, of each TclServer reply.
+        :return: generator of captured frames, frames that could not be read are skipped.
+        """
+        if frame_nums is None:
+            frame_nums = range(1, self.captureBuffer.n_packets + 1)
+        return self.captureBuffer.read_frames(frame_nums, reply_budget)
 
     #
     # Statistics.
@@ -340,6 +503,8 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
         stat.enableValidStats = True
         stat.ix_set()
         stat.write()
+        self.stats_generation += 1
+        self.session.stats_generation += 1
 
     def clear_all_stats(self) -> None:
         """Clear all statistic counters (port, streams and packet groups) on list of ports."""
@@ -362,6 +527,7 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
         if isinstance(mode, IxePhyMode):
             if mode.value:
                 self.api.call_rc("port setPhyMode {} {}".format(mode.value, self.uri))
+                self._set_dirty("port")
         else:
             self.api.call_rc(
                 "port setPhyMode {} {}".format(
@@ -369,6 +535,7 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
                     self.uri,
                 )
             )
+            self._set_dirty("port")
 
     def set_receive_modes(self, *modes):
         """Set port receive modes (overwrite existing value).
@@ -396,6 +563,7 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
         """
 
         self.api.call_rc("port setTransmitMode {} {}".format(mode, self.uri))
+        self._set_dirty("port")
 
     def set_rx_ports(self, *rx_ports):
         for stream in self.get_objects_by_type("stream"):
@@ -409,6 +577,12 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
             value = optList[opt]
             self.api.call("%s config -%s %s" % (self.__tcl_command__, opt, value))
         self.ix_set()
+        self._set_dirty("port")
+
+    def ix_command(self, command, *args, **kwargs):
+        if command in ["reset", "setFactoryDefaults", "setModeDefaults"]:
+            self._set_dirty("port")
+        return super().ix_command(command, *args, **kwargs)
 
     def set_wide_packet_group(self) -> None:
         self.set_receive_modes(IxeReceiveMode.widePacketGroup, IxeReceiveMode.dataIntegrity)
@@ -487,6 +661,10 @@ class IxePort(IxeObject, metaclass=ixe_obj_meta):
     # Private methods.
     #
 
+    def _set_dirty(self, scope: str = "config") -> None:
+        self.dirty.add(scope)
+        self.loaded_config = None
+
     def _set_receive_modes(self, receiveMode, *modes):
         for mode in modes:
             receiveMode += mode.value
@@ -522,21 +700,159 @@ class IxeCaptureBuffer(IxeObject, metaclass=ixe_obj_meta):
     __tcl_command__ = "captureBuffer"
     __tcl_members__ = [
         TclMember("frame", flags=FLAG_RDONLY),
+        TclMember("length", type=int, flags=FLAG_RDONLY),
+        TclMember("status", type=int, flags=FLAG_RDONLY),
+        TclMember("timestamp", type=int, flags=FLAG_RDONLY),
     ]
+    dirty_scope = None
     __tcl_commands__ = ["export", "getframe"]
 
-    def __init__(self, parent):
+    # Default approximate maximum size of a single bulk frames reply, in bytes.
+    reply_budget = 1024 * 1024
+    # Initial estimation of a single frame reply size (1518 bytes frame as hex + attributes), in bytes.
+    frame_reply_size = 1518 * 3 + 64
+    # Number of frames in each capture buffer window and maximum number of windows kept locally.
+    window_size = 256
+    max_windows = 8
+
+    # (location, first, last) of the frames loaded in the TclServer capture buffer - one buffer shared by all ports.
+    loaded: Optional[Tuple[str, int, int]] = None
+
+    def __init__(self, parent, n_packets: Optional[int] = None):
+        """Create capture buffer view, frames are loaded into the TclServer capture buffer by windows, on demand.
+
+        :param parent: port.
+        :param n_packets: number of captured frames, if None read from the port capture object.
+        """
         super().__init__(parent=parent, uri=parent.uri)
-        if not self.parent.capture.nPackets:
-            return
-        self.api.call_rc("captureBuffer get {} 1 {}".format(self.uri, self.parent.capture.nPackets))
+        self.n_packets = n_packets if n_packets is not None else self.parent.capture.nPackets
+        self.range = (1, self.n_packets)
+        self.windows: Dict[int, List[Optional[List[str]]]] = OrderedDict()
+
+    def load(self, first: int = 1, last: Optional[int] = None) -> None:
+        """Set the range of frames for export and getframe and load it into the TclServer capture buffer.
+
+        export and getframe load the range on demand (by default all captured frames), so load is required only for
+        partial ranges. Note that getframe frame numbers are relative to the first frame of the range.
+
+        :param first: first frame number to load.
+        :param last: last frame number to load, if None load up to the last captured frame.
+        """
+        self.range = (first, last or self.n_packets)
+        self._load()
 
     def ix_command(self, command, *args, **kwargs):
+        if command in ["export", "getframe"]:
+            self._load()
         return self.api.call(("captureBuffer {} " + len(args) * " {}").format(command, *args))
 
+    def _load(self) -> None:
+        """Load the frames range into the TclServer capture buffer, unless another port or range was loaded since."""
+        first, last = self.range
+        if self.n_packets and IxeCaptureBuffer.loaded != (self.uri, first, last):
+            IxeCaptureBuffer.loaded = None
+            self.api.call_rc(f"captureBuffer get {self.uri} {first} {last}")
+            IxeCaptureBuffer.loaded = (self.uri, first, last)
+
     def ix_get(self, member=None, force=False):
         pass
 
+    def read_raw_frames(
+        self, frame_nums: Iterable[int], reply_budget: Optional[int] = None
+    ) -> Iterator[Tuple[int, Optional[List[str]]]]:
+        """Read captured frames in chunks, one round trip per chunk.
+
+        :param frame_nums: frame numbers to read.
+        :param reply_budget: approximate maximum size, in bytes, of each TclServer reply.
+        :return: generator of (frame number, [timestamp, length, status, frame hex]), None for frames that could not be read.
+        """
+        for chunk in self._read_chunks(frame_nums, reply_budget):
+            yield from chunk
+
+    def read_frames(self, frame_nums: Iterable[int], reply_budget: Optional[int] = None) -> Iterator[IxeCapFrame]:
+        """Read captured frames in chunks, one round trip per chunk, and decode the frames data.
+
+        The hex data of all frames in a chunk is decoded with a single bytes.fromhex call.
+
+        :param frame_nums: frame numbers to read.
+        :param reply_budget: approximate maximum size, in bytes, of each TclServer reply.
+        :return: generator of captured frames, frames that could not be read are skipped.
+        """
+        for chunk in self._read_chunks(frame_nums, reply_budget):
+            frames = [(n, f) for n, f in chunk if f]
+            hex_frames = [f[3].strip() for _, f in frames]
+            data = memoryview(bytes.fromhex(" ".join(hex_frames)))
+            offset = 0
+            for (frame_num, (timestamp, length, status, _)), hex_frame in zip(frames, hex_frames):
+                size = len(hex_frame.split())
+                yield IxeCapFrame(frame_num, int(timestamp), int(length), int(status), data[offset : offset + size].tobytes())
+                offset += size
+
+    def _read_chunks(
+        self, frame_nums: Iterable[int], reply_budget: Optional[int] = None
+    ) -> Iterator[List[Tuple[int, Optional[List[str]]]]]:
+        """Read captured frames in chunks, loading missing windows with one round trip per chunk.
+
+        Frames are served from the locally kept windows (LRU) when possible. The number of windows loaded per round trip is
+        adapted after each round trip to keep replies about reply_budget.
+        """
+        reply_budget = reply_budget or self.reply_budget
+        pending = []
+        missing = []
+        for frame_num in frame_nums:
+            window = (frame_num - 1) // self.window_size
+            if 1 <= frame_num <= self.n_packets and window not in self.windows and window not in missing:
+                if len(missing) >= max(reply_budget // (self.window_size * self.frame_reply_size), 1):
+                    yield self._resolve(pending, missing)
+                    pending, missing = [], []
+                missing.append(window)
+            pending.append(frame_num)
+            if len(pending) >= self.max_windows * self.window_size:
+                yield self._resolve(pending, missing)
+                pending, missing = [], []
+        if pending:
+            yield self._resolve(pending, missing)
+
+    def _resolve(self, frame_nums: List[int], missing: List[int]) -> List[Tuple[int, Optional[List[str]]]]:
+        """Load missing windows in a single round trip, then resolve frames from the loaded and locally kept windows."""
+        loaded = {}
+        if missing:
+            windows = [(w * self.window_size + 1, min((w + 1) * self.window_size, self.n_packets)) for w in missing]
+            IxeCaptureBuffer.loaded = None
+            result = self.api.call_script(
+                "set r {};"
+                "foreach {first last} $windows {"
+                'set rc [captureBuffer get {*}$location $first $last]; if {$rc} {error "captureBuffer get - rc = $rc"};'
+                "set w {};"
+                "for {set n 1} {$n <= $last - $first + 1} {incr n} {"
+                "if {[captureBuffer getframe $n]} {lappend w {}; continue};"
+                "lappend w [list [captureBuffer cget -timestamp] [captureBuffer cget -length] [captureBuffer cget -status]"
+                " [captureBuffer cget -frame]]"
+                "};"
+                "lappend r $w"
+                "};"
+                "set r",
+                location=self.uri,
+                windows=" ".join(f"{first} {last}" for first, last in windows),
+            )
+            IxeCaptureBuffer.loaded = (self.uri, *windows[-1])
+            self.frame_reply_size = max(len(result) // sum(last - first + 1 for first, last in windows), 1)
+            for window, frames in zip(missing, split_tcl_list(result)):
+                loaded[window] = [split_tcl_list(f) if f else None for f in split_tcl_list(frames)]
+        frames = []
+        for frame_num in frame_nums:
+            window, index = divmod(frame_num - 1, self.window_size)
+            frames_window = loaded.get(window) or self.windows.get(window)
+            frames.append((frame_num, frames_window[index] if frames_window and 1 <= frame_num <= self.n_packets else None))
+        for window, frames_window in loaded.items():
+            self.windows[window] = frames_window
+        for window in OrderedDict.fromkeys((n - 1) // self.window_size for n in frame_nums):
+            if window in self.windows:
+                self.windows.move_to_end(window)
+        while len(self.windows) > self.max_windows:
+            self.windows.popitem(last=False)
+        return frames
+
 
 class IxeFilterPalettePort(IxePortObj, metaclass=ixe_obj_meta):
     __tcl_command__ = "filterPallette"
@@ -737,5 +1053,5 @@ class IxePortCpu(IxePortObj, metaclass=ixe_obj_meta):
     ]
 
     def reset_cpu(self) -> None:
-        if self.parent.isValidFeature("portFeatureLocalCPU"):
+        if self.parent.is_valid_feature("portFeatureLocalCPU"):
             self.reset()
@@ -5,9 +5,12 @@ Classes and utilities to manage IxExplorer statistics views.
 import time
 from collections import OrderedDict
 from enum import Enum
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
 
 import ixexplorer.ixe_port
-from ixexplorer.api.ixapi import FLAG_IGERR, FLAG_RDONLY, IxTclHalError, TclMember, ixe_obj_meta
+from ixexplorer.api.ixapi import FLAG_IGERR, FLAG_RDONLY, IxTclHalApi, IxTclHalError, TclMember, ixe_obj_meta, split_tcl_list
 from ixexplorer.ixe_object import IxeObject
 
 
@@ -16,6 +19,7 @@ class IxeCapFileFormat(Enum):
     enc = 2
     txt = 3
     mem = 4
+    pcap = 5
 
 
 class IxeStat(IxeObject, metaclass=ixe_obj_meta):
@@ -86,6 +90,7 @@ class IxeStat(IxeObject, metaclass=ixe_obj_meta):
         TclMember("fcoeRxSharedStatType1"),
         TclMember("fcoeRxSharedStatType2"),
     ]
+    dirty_scope = None
     __tcl_commands__ = ["write"]
     __get_command__ = None
 
@@ -143,6 +148,7 @@ class IxePgStats(IxeObject, metaclass=ixe_obj_meta):
         TclMember("totalFrames", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
         TclMember("totalSequenceError", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
     ]
+    dirty_scope = None
     __get_command__ = "getGroup"
 
     def __init__(self, parent, group_id):
@@ -161,6 +167,158 @@ class IxePgStats(IxeObject, metaclass=ixe_obj_meta):
         # No group or no packets on group.
         return stats_values
 
+    @classmethod
+    def read_bulk(
+        cls, windows: Dict[object, List[Tuple[int, int, List[int]]]], *stats: str, api: Optional[IxTclHalApi] = None
+    ) -> Dict[object, np.ndarray]:
+        """Read packet group statistics of many groups on many RX ports in a single round trip.
+
+        :param windows: {RX port: [(first group ID, last group ID, [group IDs to read])]}, see IxePgIndex.
+        :param stats: list of requested statistics to read, if empty - read all statistics.
+        :param api: TclServer connection to read with, if None - the session connection.
+        :return: {RX port: 2-D array of groups (in windows order) x [totalFrames] + stats}, -1 for failed reads.
+        """
+        if not stats:
+            stats = [m.attrname for m in cls.__tcl_members__ if m.flags & FLAG_RDONLY]
+        counters = ["totalFrames"] + list(stats)
+        windows = {p: w for p, w in windows.items() if w}
+        if not windows:
+            return {}
+        result = (api or IxeObject.session.api).call_script(
+            "set r {};"
+            "foreach {l first last ids} $windows {"
+            'set rc [packetGroupStats get {*}$l $first $last]; if {$rc} {error "packetGroupStats get $l - rc = $rc"};'
+            "foreach id $ids {"
+            "if {[packetGroupStats getGroup $id]} {foreach c $counters {lappend r -1}; continue};"
+            "foreach c $counters {if {[catch {packetGroupStats cget -$c} v]} {set v -1}; lappend r $v}"
+            "}"
+            "};"
+            "set r",
+            windows=_windows_param(windows),
+            counters=" ".join(counters),
+        )
+        cls.current_object = None
+        float_stats = {m.attrname for m in cls.__tcl_members__ if m.type is float}
+        dtype = np.float64 if float_stats.intersection(counters) else np.int64
+        values = _stats_array(split_tcl_list(result), dtype).reshape(-1, len(counters))
+        port_stats = OrderedDict()
+        row = 0
+        for port, port_windows in windows.items():
+            rows = sum(len(ids) for _, _, ids in port_windows)
+            port_stats[port] = values[row : row + rows]
+            row += rows
+        return port_stats
+
+    @classmethod
+    def read_latency_bins(
+        cls, windows: Dict[object, List[Tuple[int, int, List[int]]]], api: Optional[IxTclHalApi] = None
+    ) -> Dict[object, np.ndarray]:
+        """Read latency bins frames counts of many groups on many RX ports in a single round trip.
+
+        The number of bins of each RX port is len(packetGroup.latencyBinList) + 1.
+
+        :param windows: {RX port: [(first group ID, last group ID, [group IDs to read])]}, see IxePgIndex.
+        :param api: TclServer connection to read with, if None - the session connection.
+        :return: {RX port: 2-D array of groups (in windows order) x latency bins frames counts}, -1 for failed reads.
+        """
+        return cls._read_bins(
+            windows,
+            "set n [expr {[llength [packetGroup cget -latencyBinList]] + 1}]",
+            "for {set b 1} {$b <= $n} {incr b} {"
+            "if {[catch {packetGroupStats getLatencyBin $b} rc] || $rc} {lappend v -1; continue};"
+            "lappend v [latencyBin cget -numFrames]"
+            "}",
+            [],
+            api,
+        )
+
+    @classmethod
+    def read_time_bins(
+        cls, windows: Dict[object, List[Tuple[int, int, List[int]]]], *stats: str, api: Optional[IxTclHalApi] = None
+    ) -> Dict[object, np.ndarray]:
+        """Read time bins statistics of many groups on many RX ports in a single round trip.
+
+        The number of time bins of each RX port is packetGroup.numTimeBins.
+
+        :param windows: {RX port: [(first group ID, last group ID, [group IDs to read])]}, see IxePgIndex.
+        :param stats: list of requested statistics to read, if empty - read all statistics.
+        :param api: TclServer connection to read with, if None - the session connection.
+        :return: {RX port: 3-D array of groups (in windows order) x time bins x stats}, -1 for failed reads.
+        """
+        if not stats:
+            stats = [m.attrname for m in cls.__tcl_members__ if m.flags & FLAG_RDONLY]
+        port_values = cls._read_bins(
+            windows,
+            "set n [packetGroup cget -numTimeBins]",
+            "for {set t 0} {$t < $n} {incr t} {"
+            "if {[catch {packetGroupStats getGroup $id $t} rc] || $rc} {foreach c $counters {lappend v -1}; continue};"
+            "foreach c $counters {if {[catch {packetGroupStats cget -$c} x]} {set x -1}; lappend v $x}"
+            "}",
+            list(stats),
+            api,
+        )
+        return {p: v.reshape(v.shape[0], -1, len(stats)) for p, v in port_values.items()}
+
+    @classmethod
+    def _read_bins(
+        cls,
+        windows: Dict[object, List[Tuple[int, int, List[int]]]],
+        bins_count: str,
+        read_group: str,
+        counters: List[str],
+        api: Optional[IxTclHalApi] = None,
+    ) -> Dict[object, np.ndarray]:
+        """Run bins read script for all groups on all RX ports.
+
+        bins_count sets n, the number of bins of the current RX port, and read_group appends the values of group id to v.
+        """
+        windows = {p: w for p, w in windows.items() if w}
+        if not windows:
+            return {}
+        result = (api or IxeObject.session.api).call_script(
+            "set r {}; set current {};"
+            "foreach {l first last ids} $windows {"
+            f"if {{$l ne $current}} {{packetGroup getRx {{*}}$l; {bins_count}; set current $l; lappend r $n}};"
+            'set rc [packetGroupStats get {*}$l $first $last]; if {$rc} {error "packetGroupStats get $l - rc = $rc"};'
+            "foreach id $ids {"
+            "set v {};"
+            f"if {{[packetGroupStats getGroup $id]}} {{set v [lrepeat [expr {{$n * $width}}] -1]}} else {{{read_group}}};"
+            "lappend r $v"
+            "}"
+            "};"
+            "set r",
+            windows=_windows_param(windows),
+            counters=" ".join(counters),
+            width=max(len(counters), 1),
+        )
+        cls.current_object = None
+        ixexplorer.ixe_port.IxePacketGroupPort.current_object = None
+        float_stats = {m.attrname for m in cls.__tcl_members__ if m.type is float}
+        dtype = np.float64 if float_stats.intersection(counters) else np.int64
+        values = iter(split_tcl_list(result))
+        port_values = OrderedDict()
+        for port, port_windows in windows.items():
+            bins = int(next(values)) * max(len(counters), 1)
+            groups = [split_tcl_list(next(values)) for _, _, ids in port_windows for _ in ids]
+            port_values[port] = _stats_array([v for g in groups for v in g], dtype).reshape(len(groups), bins)
+        return port_values
+
+
+class IxeLatencyBin(IxeObject, metaclass=ixe_obj_meta):
+    __tcl_command__ = "latencyBin"
+    __tcl_members__ = [
+        TclMember("bitRate", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("byteRate", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("firstTimeStamp", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("frameRate", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("lastTimeStamp", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("maxLatency", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("minLatency", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+        TclMember("numFrames", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
+    ]
+    dirty_scope = None
+    __get_command__ = None
+
 
 class IxeStreamTxStats(IxeObject, metaclass=ixe_obj_meta):
     __tcl_command__ = "streamTransmitStats"
@@ -168,6 +326,7 @@ class IxeStreamTxStats(IxeObject, metaclass=ixe_obj_meta):
         TclMember("framesSent", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
         TclMember("frameRate", type=int, flags=FLAG_RDONLY | FLAG_IGERR),
     ]
+    dirty_scope = None
     __get_command__ = "getGroup"
 
     def __init__(self, parent, group_id):
@@ -175,28 +334,187 @@ class IxeStreamTxStats(IxeObject, metaclass=ixe_obj_meta):
 
 
 class IxeStats:
-    pass
+    """Base statistics view, set sink (IxeStatsSink) to stream each read_stats snapshot to file."""
+
+    sink = None
+    timestamp: Optional[float] = None
+    # TclServer connection to read the statistics with, None - the session connection.
+    api: Optional[IxTclHalApi] = None
+
+    def _api(self) -> IxTclHalApi:
+        return self.api or IxeObject.session.api
+
+    def _publish(self) -> None:
+        if self.sink is not None:
+            self.sink.write(self.statistics, self.timestamp)
+
+
+def _stats_array(values: List[str], dtype: type) -> np.ndarray:
+    """Convert statistics values read from the TclServer to array, empty or non numeric values are -1."""
+    try:
+        return np.array(values, dtype=str).astype(dtype)
+    except ValueError:
+        return np.array([_stats_value(v, dtype) for v in values], dtype=dtype)
+
+
+def _stats_value(value: str, dtype: type) -> object:
+    try:
+        return dtype(value)
+    except ValueError:
+        return -1
+
+
+def _windows_param(windows: Dict[object, List[Tuple[int, int, List[int]]]]) -> str:
+    """Format group IDs windows as Tcl list of {location} first last {ids} for bulk packet group scripts."""
+    return " ".join(
+        f"{{{p.uri}}} {first} {last} {{{' '.join(str(i) for i in ids)}}}" for p, w in windows.items() for first, last, ids in w
+    )
+
+
+class IxePgIndex:
+    """Packet group IDs and names of streams and the group IDs windows to fetch per RX port.
+
+    The index is rebuilt, reading the group IDs and names of all streams in a single round trip, only when streams
+    change.
+    """
+
+    # Maximum gap between group IDs fetched in the same packetGroupStats get window.
+    max_gap = 64
+
+    def __init__(self) -> None:
+        self.key = None
+        self.group_ids: Dict[object, int] = {}
+        self.names: Dict[object, str] = {}
+        self.windows: Dict[object, List[Tuple[int, int, List[int]]]] = {}
+
+    def update(self, streams: Iterable, rx_ports: Iterable, api: Optional[IxTclHalApi] = None) -> None:
+        """Rebuild the index if streams (or their RX ports) changed since last update.
+
+        :param streams: TX streams.
+        :param rx_ports: RX ports.
+        :param api: TclServer connection to read with, if None - the session connection.
+        """
+        from ixexplorer.ixe_stream import IxePacketGroupStream, IxeStream
+
+        streams = list(streams)
+        rx_ports = list(rx_ports)
+        key = (IxeStream.generation, tuple((s, tuple(s.rx_ports)) for s in streams), tuple(rx_ports))
+        if key == self.key:
+            return
+        values = []
+        if streams:
+            result = (api or IxeObject.session.api).call_script(
+                "set r {};"
+                "foreach l $locations {"
+                "stream get {*}$l; packetGroup getTx {*}$l; lappend r [packetGroup cget -groupId] [stream cget -name]"
+                "};"
+                "set r",
+                locations=" ".join("{" + s.uri + "}" for s in streams),
+            )
+            IxeStream.current_object = None
+            IxePacketGroupStream.current_object = None
+            values = split_tcl_list(result)
+        self.group_ids = dict(zip(streams, [int(g) for g in values[::2]]))
+        self.names = dict(zip(streams, values[1::2]))
+        self.windows = {}
+        for rx_port in rx_ports:
+            ids = sorted({g for s, g in self.group_ids.items() if not s.rx_ports or rx_port in s.rx_ports})
+            windows = []
+            for group_id in ids:
+                if windows and group_id - windows[-1][1] <= self.max_gap:
+                    windows[-1][1] = group_id
+                    windows[-1][2].append(group_id)
+                else:
+                    windows.append([group_id, group_id, [group_id]])
+            self.windows[rx_port] = [tuple(w) for w in windows]
+        self.key = key
 
 
 class IxePortsStats(IxeStats):
     def __init__(self, *ports):
         super().__init__()
         self.ports = ports if ports else IxeObject.session.ports.values()
+        # Port statistics objects, created once and reused by every read.
+        self.stat_objects: Dict[object, Tuple[IxeStatTotal, IxeStatRate]] = {}
 
     def set_attributes(self, **attributes):
         for port in self.ports:
-            IxeStatTotal(port).set_attributes(**attributes)
+            self._stat_objects(port)[0].set_attributes(**attributes)
 
-    def read_stats(self, *stats):
+    def _stat_objects(self, port) -> Tuple[IxeStatTotal, IxeStatRate]:
+        if port not in self.stat_objects:
+            self.stat_objects[port] = (IxeStatTotal(port), IxeStatRate(port))
+        return self.stat_objects[port]
+
+    def enable_sync_stats(self, interval: Optional[int] = None) -> None:
+        """Enable TX/RX synchronized statistics (enableTxRxSyncStatsMode) on all ports that support it.
+
+        With synchronized statistics the chassis freezes the counters of all ports at the same time, every
+        txRxSyncInterval, so counters of different ports read by read_stats(synchronized=True) are consistent.
+
+        :param interval: txRxSyncInterval in milliseconds, if None - keep the ports interval.
+        """
+        spec = OrderedDict()
+        for port in self.ports:
+            if port.is_valid_feature("portFeatureTxRxSyncStats"):
+                spec[port] = {"enableTxRxSyncStatsMode": True}
+                if interval is not None:
+                    spec[port]["txRxSyncInterval"] = interval
+        IxeObject.session.apply(spec)
+
+    def read_stats(self, *stats, synchronized: bool = False):
         """Read port statistics from chassis.
 
         :param stats: list of requested statistics to read, if empty - read all statistics.
+        :param synchronized: True - read the statistics of all ports together (statGroup) in a single round trip and set
+            timestamp to the TclServer time of the read, False - read ports one by one.
         """
+        if synchronized:
+            return self._read_sync_stats(*stats)
+        self.timestamp = None
         self.statistics = OrderedDict()
         for port in self.ports:
-            port_stats = IxeStatTotal(port).get_attributes(FLAG_RDONLY, *stats)
-            port_stats.update({c + "_rate": v for c, v in IxeStatRate(port).get_attributes(FLAG_RDONLY, *stats).items()})
+            stat_total, stat_rate = self._stat_objects(port)
+            stat_total.api = stat_rate.api = self._api()
+            port_stats = stat_total.get_attributes(FLAG_RDONLY, *stats)
+            port_stats.update({c + "_rate": v for c, v in stat_rate.get_attributes(FLAG_RDONLY, *stats).items()})
             self.statistics[str(port)] = port_stats
+        self._publish()
+        return self.statistics
+
+    def _read_sync_stats(self, *stats):
+        members = OrderedDict((m.attrname, m) for m in IxeStat.__tcl_members__ if m.flags & FLAG_RDONLY)
+        stats = [s for s in stats if s in members] if stats else list(members)
+        result = self._api().call_script(
+            "statGroup setDefault;"
+            "foreach l $locations {statGroup add {*}$l};"
+            'if {[statGroup get]} {error "statGroup get failed"};'
+            "set t [clock milliseconds];"
+            'if {[statGroup getRate]} {error "statGroup getRate failed"};'
+            "set r [list $t];"
+            "foreach l $locations {"
+            "foreach c {get getRate} {"
+            "set v {};"
+            "if {[statList $c {*}$l]} {set v [lrepeat [llength $names] -1]} else {"
+            "foreach n $names {if {[catch {statList cget -$n} x]} {set x -1}; lappend v $x}"
+            "};"
+            "lappend r $v"
+            "}"
+            "};"
+            "statGroup setDefault;"
+            "set r",
+            locations=" ".join(f"{{{p.uri}}}" for p in self.ports),
+            names=" ".join(members[s].name for s in stats),
+        )
+        values = split_tcl_list(result)
+        self.timestamp = int(values[0]) / 1000
+        self.statistics = OrderedDict()
+        for i, port in enumerate(self.ports):
+            totals, rates = split_tcl_list(values[1 + 2 * i]), split_tcl_list(values[2 + 2 * i])
+            port_stats = OrderedDict((s, members[s].type(v)) for s, v in zip(stats, totals))
+            port_stats.update((s + "_rate", members[s].type(v)) for s, v in zip(stats, rates))
+            self.statistics[str(port)] = port_stats
+        self._publish()
         return self.statistics
 
 
@@ -232,42 +550,332 @@ class IxeStreamsStats(IxeStats):
             if p.receiveMode & int(ixexplorer.ixe_port.IxeReceiveMode.widePacketGroup.value)
         ]
 
-    def read_stats(self, *stats):
+        # Packet groups index of this view, rebuilt only when its streams change.
+        self.pg_index = IxePgIndex()
+        # Last snapshot of rate counters {(stream, RX port or None for TX): (time, {counter: value})} and the session
+        # statistics generation they were read in.
+        self.snapshots: Dict[tuple, Tuple[float, Dict[str, int]]] = {}
+        self.stats_generation = None
+
+    # Rate statistics and the counters they are derived from.
+    tx_rates = {"frameRate": "framesSent"}
+    rx_rates = {"frameRate": "totalFrames", "byteRate": "totalByteCount"}
+
+    def read_stats(self, *stats, chassis_rates: bool = False):
         """Read stream statistics from chassis.
 
+        Packet group statistics are fetched only for the group IDs windows in use on each RX port.
+
+        By default rates (frameRate, byteRate, bitRate) are calculated locally from the counters of this read and the
+        previous read of the same stream by this view, so each read is a single fetch with no sleep. Rates are 0 on the
+        first read and after counters were cleared by the session (clear_all_stats, clear_ports).
+
         :param stats: list of requested statistics to read, if empty - read all statistics.
+        :param chassis_rates: True - read the chassis rates (read twice with sleep between the reads), False - calculate
+            rates locally.
         """
-        from ixexplorer.ixe_stream import IxePacketGroupStream
-
-        sleep_time = 0.1  # in cases we only want few counters but very fast we need a smaller sleep time
-        if not stats:
+        all_stats = not stats
+        if all_stats:
             stats = [m.attrname for m in IxePgStats.__tcl_members__ if m.flags & FLAG_RDONLY]
-            sleep_time = 1
-
-        # Read twice to refresh rate statistics.
-        for port in self.tx_ports_streams:
-            port.api.call_rc("streamTransmitStats get {} 1 4096".format(port.uri))
-        for rx_port in self.rx_ports:
-            rx_port.api.call_rc("packetGroupStats get {} 0 65536".format(rx_port.uri))
-        time.sleep(sleep_time)
+        if self.stats_generation != IxeObject.session.stats_generation:
+            self.snapshots.clear()
+            self.stats_generation = IxeObject.session.stats_generation
+
+        streams = [s for streams in self.tx_ports_streams.values() for s in streams]
+        self.pg_index.update(streams, self.rx_ports, self._api())
+        windows = {p: self.pg_index.windows[p] for p in self.rx_ports}
+
+        if chassis_rates:
+            # Read twice to refresh rate statistics.
+            self._read_tx_stats()
+            rx_windows = [(p.uri, first, last) for p in self.rx_ports for first, last, _ in self.pg_index.windows[p]]
+            if rx_windows:
+                self._api().call_script(
+                    "foreach {l first last} $windows {packetGroupStats get {*}$l $first $last}",
+                    windows=" ".join(f"{{{l}}} {first} {last}" for l, first, last in rx_windows),
+                )
+            # In cases we only want few counters but very fast we need a smaller sleep time.
+            time.sleep(1 if all_stats else 0.1)
+            read_stats = list(stats)
+        else:
+            rates_counters = [c for r, c in self.rx_rates.items() if r in stats or (r == "byteRate" and "bitRate" in stats)]
+            read_stats = list(
+                OrderedDict.fromkeys([s for s in stats if s not in self.rx_rates and s != "bitRate"] + rates_counters)
+            )
+
+        tx_stats = self._read_tx_stats()
+        tx_time = time.monotonic()
+        stats_types = {m.attrname: m.type for m in IxePgStats.__tcl_members__}
+        rx_stats = {}
+        for rx_port, values in IxePgStats.read_bulk(windows, *read_stats, api=self._api()).items():
+            group_ids = [g for _, _, ids in windows[rx_port] for g in ids]
+            for group_id, group_values in zip(group_ids, values):
+                if group_values[0] > 0:
+                    group_stats = [stats_types[c](v) for c, v in zip(read_stats, group_values[1:])]
+                else:
+                    # No group or no packets on group.
+                    group_stats = [-1] * len(read_stats)
+                rx_stats[rx_port, group_id] = OrderedDict(zip(read_stats, group_stats))
+        rx_time = time.monotonic()
 
         self.statistics = OrderedDict()
-        for tx_port, streams in self.tx_ports_streams.items():
-            for stream in streams:
-                stream_stats = OrderedDict()
-                tx_port.api.call_rc("streamTransmitStats get {} 1 4096".format(tx_port.uri))
-                stream_tx_stats = IxeStreamTxStats(tx_port, stream.index)
-                stream_stats_tx = {c: v for c, v in stream_tx_stats.get_attributes(FLAG_RDONLY).items()}
-                stream_stats["tx"] = stream_stats_tx
-                stream_stat_pgid = IxePacketGroupStream(stream).groupId
-                stream_stats_pg = PgStatsDict()
-                for port in IxeObject.session.ports.values():
-                    stream_stats_pg[str(port)] = OrderedDict(zip(stats, [-1] * len(stats)))
-                for rx_port in self.rx_ports:
-                    if not stream.rx_ports or rx_port in stream.rx_ports:
-                        rx_port.api.call_rc("packetGroupStats get {} 0 65536".format(rx_port.uri))
-                        pg_stats = IxePgStats(rx_port, stream_stat_pgid)
-                        stream_stats_pg[str(rx_port)] = pg_stats.read_stats(*stats)
-                stream_stats["rx"] = stream_stats_pg
-                self.statistics[str(stream)] = stream_stats
+        for stream in streams:
+            stream_stats = OrderedDict()
+            stream_stats_tx = tx_stats[stream]
+            if not chassis_rates:
+                stream_stats_tx.update(self._local_rates((stream, None), tx_time, stream_stats_tx, self.tx_rates))
+            stream_stats["tx"] = stream_stats_tx
+            stream_stat_pgid = self.pg_index.group_ids[stream]
+            stream_stats_pg = PgStatsDict()
+            for port in IxeObject.session.ports.values():
+                stream_stats_pg[str(port)] = OrderedDict(zip(stats, [-1] * len(stats)))
+            for rx_port in self.rx_ports:
+                if not stream.rx_ports or rx_port in stream.rx_ports:
+                    group_stats = rx_stats[rx_port, stream_stat_pgid]
+                    if not chassis_rates:
+                        rates = self._local_rates((stream, rx_port), rx_time, group_stats, self.rx_rates)
+                        rates["bitRate"] = rates["byteRate"] * 8 if "byteRate" in rates else 0
+                        group_stats = OrderedDict((s, rates[s] if s in rates else group_stats[s]) for s in stats)
+                    stream_stats_pg[str(rx_port)] = group_stats
+            stream_stats["rx"] = stream_stats_pg
+            self.statistics[self.pg_index.names[stream]] = stream_stats
+        self._publish()
         return self.statistics
+
+    def read_arrays(self, tx_stats: List[str], rx_stats: List[str]) -> Tuple[list, np.ndarray, np.ndarray]:
+        """Read streams statistics as arrays, without building the statistics dictionaries.
+
+        TX statistics are read in a single round trip and RX statistics with IxePgStats.read_bulk, the groups rows of
+        each RX port are mapped to the streams with the packet groups index.
+
+        :param tx_stats: TX statistics to read (IxeStreamTxStats members).
+        :param rx_stats: RX statistics to read (IxePgStats members).
+        :return: (streams, TX values - streams x tx_stats, RX values - streams x rx_ports x rx_stats), RX values of
+            streams not received by the port or without packets on the group are -1.
+        """
+        streams = [s for streams in self.tx_ports_streams.values() for s in streams]
+        self.pg_index.update(streams, self.rx_ports, self._api())
+
+        tx_values = np.full((len(streams), len(tx_stats)), -1, dtype=np.int64)
+        if tx_stats and streams:
+            stream_stats = self._read_tx_stats()
+            tx_values[:] = [[stream_stats[s][c] for c in tx_stats] for s in streams]
+
+        float_stats = {m.attrname for m in IxePgStats.__tcl_members__ if m.type is float}
+        dtype = np.float64 if float_stats.intersection(rx_stats) else np.int64
+        rx_values = np.full((len(streams), len(self.rx_ports), len(rx_stats)), -1, dtype=dtype)
+        if not rx_stats:
+            return streams, tx_values, rx_values
+        windows = {p: self.pg_index.windows[p] for p in self.rx_ports}
+        stream_group_ids = np.array([self.pg_index.group_ids[s] for s in streams], dtype=np.int64)
+        port_values = IxePgStats.read_bulk(windows, *rx_stats, api=self._api())
+        for j, rx_port in enumerate(self.rx_ports):
+            if rx_port not in port_values:
+                continue
+            received = np.array([not s.rx_ports or rx_port in s.rx_ports for s in streams], dtype=bool)
+            # Group IDs of each RX port windows are sorted, so each stream row is found by binary search.
+            group_ids = np.array([g for _, _, ids in windows[rx_port] for g in ids], dtype=np.int64)
+            rows = port_values[rx_port][np.searchsorted(group_ids, stream_group_ids[received])]
+            # No group or no packets on group.
+            rows[rows[:, 0] <= 0, 1:] = -1
+            rx_values[received, j] = rows[:, 1:]
+        return streams, tx_values, rx_values
+
+    def _read_tx_stats(self) -> Dict[object, Dict[str, int]]:
+        """Read TX statistics of all streams in a single round trip."""
+        members = [m for m in IxeStreamTxStats.__tcl_members__ if m.flags & FLAG_RDONLY]
+        tx_ports_streams = {p: s for p, s in self.tx_ports_streams.items() if s}
+        if not tx_ports_streams:
+            return {}
+        try:
+            result = self._api().call_script(
+                "set r {};"
+                "foreach {l streams} $ports {"
+                "set rc [streamTransmitStats get {*}$l 1 4096];"
+                'if {$rc} {error "streamTransmitStats get $l - rc = $rc"};'
+                "foreach s $streams {"
+                "if {[streamTransmitStats getGroup $s]} {foreach c $counters {lappend r -1}; continue};"
+                "foreach c $counters {if {[catch {streamTransmitStats cget -$c} v]} {set v -1}; lappend r $v}"
+                "}"
+                "};"
+                "set r",
+                ports=" ".join(
+                    f"{{{p.uri}}} {{{' '.join(str(s.index) for s in streams)}}}" for p, streams in tx_ports_streams.items()
+                ),
+                counters=" ".join(m.name for m in members),
+            )
+        finally:
+            # Failed or not, temporary streamTransmitStats no longer holds the values of any stream.
+            IxeStreamTxStats.current_object = None
+        values = iter(result.split())
+        return {
+            s: OrderedDict((m.attrname, m.type(next(values))) for m in members)
+            for streams in tx_ports_streams.values()
+            for s in streams
+        }
+
+    def _local_rates(self, key: tuple, now: float, counters: Dict[str, int], rates: Dict[str, str]) -> Dict[str, float]:
+        """Calculate rates from the counters and the previous snapshot of the same key, then save the new snapshot."""
+        snapshot = {c: counters[c] for c in rates.values() if c in counters}
+        previous_time, previous = self.snapshots.get(key, (None, {}))
+        self.snapshots[key] = (now, snapshot)
+        local_rates = {}
+        for rate, counter in rates.items():
+            if counter not in snapshot:
+                continue
+            value, previous_value = snapshot[counter], previous.get(counter, -1)
+            if previous_time is None or now <= previous_time or value < 0 or previous_value < 0:
+                local_rates[rate] = 0
+            else:
+                local_rates[rate] = (value - previous_value) / (now - previous_time)
+        return local_rates
+
+
+class StatsDelta:
+    """Deltas of statistics counters between consecutive reads of ports or streams statistics.
+
+    The previous snapshot is kept as array and only counters that changed since the previous read are returned.
+    Counters wrap is handled by counter width, negative delta of 64 bits counter or delta after statistics clear of the
+    row port (clear_all_stats, clear_ports, IxePort.clear_port_stats) is the counter value itself (counter restarted
+    from 0). TX rows belong to the stream TX port and RX rows to the RX port.
+    """
+
+    # Statistics that are not monotonic counters.
+    gauges = {
+        "averageLatency",
+        "duplexMode",
+        "firstTimeStamp",
+        "lastTimeStamp",
+        "lineSpeed",
+        "link",
+        "linkFaultState",
+        "maxDelayVariation",
+        "maxLatency",
+        "maxMinDelayVariation",
+        "maxminInterval",
+        "minDelayVariation",
+        "minLatency",
+        "numGroups",
+        "prbsBerRatio",
+        "readTimeStamp",
+        "standardDeviation",
+        "transmitDuration",
+    }
+
+    def __init__(self, stats: IxeStats, counter_bits: Optional[Dict[str, int]] = None, default_bits: int = 64) -> None:
+        """
+        :param stats: statistics view - IxePortsStats or IxeStreamsStats.
+        :param counter_bits: width of counters that are not default_bits wide {counter: bits}.
+        :param default_bits: default counters width.
+        """
+        self.stats = stats
+        self.counter_bits = counter_bits or {}
+        self.default_bits = default_bits
+        self.rows: List[tuple] = []
+        self.columns: List[str] = []
+        self.values = np.zeros((0, 0), dtype=np.int64)
+        # Statistics generation of each row port at the previous read.
+        self.generations = np.zeros(0, dtype=np.int64)
+        self._rows_cache = (None, [], [])
+
+    def read(self, *stats: str) -> Dict[tuple, Dict[str, int]]:
+        """Read statistics and return the counters deltas since the previous read.
+
+        Streams statistics are read as arrays - TX counters with a single round trip and RX counters with
+        IxePgStats.read_bulk over the view packet groups index - without building the statistics dictionaries.
+
+        :param stats: list of requested statistics to read, if empty - read all statistics.
+        :return: {row: {counter: delta}} for changed counters only, row is (port,) for ports statistics and
+            (stream, "tx") or (stream, "rx", port) for streams statistics. The first read returns the counters values.
+        """
+        if isinstance(self.stats, IxeStreamsStats):
+            row_keys, row_ports, columns, values = self._read_streams(*stats)
+        else:
+            row_keys, row_ports, columns, values = self._read_ports(*stats)
+        generations = np.array([p.stats_generation for p in row_ports], dtype=np.int64)
+
+        if row_keys == self.rows and columns == self.columns:
+            previous = self.values
+            previous_generations = self.generations
+        else:
+            previous = np.full(values.shape, -1, dtype=np.int64)
+            previous_generations = generations.copy()
+            row_index = {r: i for i, r in enumerate(self.rows)}
+            column_index = {c: i for i, c in enumerate(self.columns)}
+            for i, row in enumerate(row_keys):
+                if row not in row_index:
+                    continue
+                previous_generations[i] = self.generations[row_index[row]]
+                for j, column in enumerate(columns):
+                    if column in column_index:
+                        previous[i, j] = self.values[row_index[row], column_index[column]]
+
+        cleared = (generations != previous_generations)[:, np.newaxis]
+        bits = np.array([self.counter_bits.get(c, self.default_bits) for c in columns], dtype=np.uint64)
+        masks = np.where(bits >= 64, np.uint64(0xFFFFFFFFFFFFFFFF), (np.uint64(1) << bits) - np.uint64(1))
+        deltas = (values.astype(np.uint64) - previous.astype(np.uint64)) & masks
+        restarted = (previous < 0) | cleared | ((values < previous) & (bits >= 64))
+        deltas = np.where(restarted, values.astype(np.uint64), deltas)
+        changed = (deltas != 0) & (values >= 0)
+
+        self.rows, self.columns, self.values = row_keys, columns, values
+        self.generations = generations
+
+        result = OrderedDict()
+        for i, j in zip(*np.nonzero(changed)):
+            result.setdefault(row_keys[i], OrderedDict())[columns[j]] = int(deltas[i, j])
+        return result
+
+    def _is_counter(self, stat: str) -> bool:
+        return stat not in self.gauges and not stat.lower().endswith("rate")
+
+    def _read_ports(self, *stats: str) -> Tuple[List[tuple], list, List[str], np.ndarray]:
+        statistics = self.stats.read_stats(*stats)
+        ports = {str(p): p for p in self.stats.ports}
+        columns = list(
+            OrderedDict.fromkeys(
+                c
+                for values in statistics.values()
+                for c, v in values.items()
+                if isinstance(v, int) and not isinstance(v, bool) and self._is_counter(c)
+            )
+        )
+        values = np.array([[values.get(c, -1) for c in columns] for values in statistics.values()], dtype=np.int64)
+        values = values.reshape(len(statistics), len(columns))
+        return [(port,) for port in statistics], [ports[port] for port in statistics], columns, values
+
+    def _read_streams(self, *stats: str) -> Tuple[List[tuple], list, List[str], np.ndarray]:
+        view = self.stats
+
+        def counters(members: List[TclMember]) -> List[str]:
+            return [
+                m.attrname
+                for m in members
+                if m.flags & FLAG_RDONLY
+                and m.type is int
+                and self._is_counter(m.attrname)
+                and (not stats or m.attrname in stats)
+            ]
+
+        tx_columns = counters(IxeStreamTxStats.__tcl_members__)
+        rx_columns = counters(IxePgStats.__tcl_members__)
+        columns = list(OrderedDict.fromkeys(tx_columns + rx_columns))
+        streams, tx_values, rx_values = view.read_arrays(tx_columns, rx_columns)
+        # (RX port, stream) pairs, in RX port major order, of the RX rows.
+        received = [[bool(rx_columns) and (not s.rx_ports or p in s.rx_ports) for s in streams] for p in view.rx_ports]
+        received = np.array(received, dtype=bool).reshape(len(view.rx_ports), len(streams))
+
+        # Rows depend only on the streams, their RX ports and names (all in the packet groups index key).
+        rows_key = (view.pg_index.key, bool(rx_columns))
+        if rows_key != self._rows_cache[0]:
+            names = view.pg_index.names
+            tx_ports = {s: p for p, port_streams in view.tx_ports_streams.items() for s in port_streams}
+            row_keys = [(names[s], "tx") for s in streams]
+            row_keys += [(names[streams[i]], "rx", str(view.rx_ports[j])) for j, i in zip(*np.nonzero(received))]
+            row_ports = [tx_ports[s] for s in streams] + [view.rx_ports[j] for j in np.nonzero(received)[0]]
+            self._rows_cache = (rows_key, row_keys, row_ports)
+        _, row_keys, row_ports = self._rows_cache
+        values = np.full((len(row_keys), len(columns)), -1, dtype=np.int64)
+        values[: len(streams), [columns.index(c) for c in tx_columns]] = tx_values
+        values[len(streams) :, [columns.index(c) for c in rx_columns]] = rx_values.transpose(1, 0, 2)[received]
+        return row_keys, row_ports, columns, values
@@ -0,0 +1,186 @@
+"""
+Prometheus text format exporter of statistics views.
+
+A single background poller reads the statistics views every interval and renders them into a cached page, HTTP
+scrapers are served from the cache so the number of scrapers does not affect the chassis load.
+
+The poller reads the views over its own TclServer connection, so the session can be used while the exporter is running,
+but the polled views should not be read by other threads.
+"""
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+from ixexplorer.api.ixapi import IxTclHalApi
+from ixexplorer.api.tclproto import TclClient
+from ixexplorer.ixe_object import IxeObject
+from ixexplorer.ixe_stats_sink import flatten_stats
+
+logger = logging.getLogger("tgn.ixexplorer")
+
+
+def _metric_name(*parts: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", "_".join(("ixexplorer",) + parts))
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics(statistics: dict) -> Dict[str, List[str]]:
+    """Render statistics into Prometheus samples.
+
+    Ports statistics rows (port,) are rendered as ixexplorer_port_<counter>{port="port"}, streams statistics rows
+    (stream, "tx") and (stream, "rx", port) as ixexplorer_stream_tx_<counter>{stream="stream"} and
+    ixexplorer_stream_rx_<counter>{stream="stream",port="port"}. Non numeric and not available (-1) values are skipped.
+
+    :param statistics: statistics as returned by IxePortsStats/IxeStreamsStats read_stats.
+    :return: {metric name: [samples]}.
+    """
+    metrics: Dict[str, List[str]] = {}
+    for path, counters in flatten_stats(statistics).items():
+        if len(path) == 1:
+            prefix, labels = ("port",), {"port": path[0]}
+        else:
+            prefix, labels = ("stream", path[1]), {"stream": path[0]}
+            if len(path) > 2:
+                labels["port"] = path[2]
+        labels_str = ",".join(f'{k}="{_label_value(str(v))}"' for k, v in labels.items())
+        for counter, value in counters.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or value == -1:
+                continue
+            name = _metric_name(*prefix, counter)
+            metrics.setdefault(name, []).append(f"{name}{{{labels_str}}} {value}")
+    return metrics
+
+
+class IxeStatsExporter:
+    """Serve the latest statistics of statistics views in Prometheus text format."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(
+        self,
+        *views,
+        stats: Optional[Dict[object, Iterable[str]]] = None,
+        address: str = "127.0.0.1",
+        port: int = 9100,
+        interval: float = 5.0,
+    ) -> None:
+        """Create the exporter, call start to start polling and serving.
+
+        :param views: statistics views (IxePortsStats, IxeStreamsStats) to poll.
+        :param stats: requested statistics per view {view: [stats]}, views not in stats read all statistics.
+        :param address: HTTP server address.
+        :param port: HTTP server port, 0 - any free port (see server_port after start).
+        :param interval: seconds between polls.
+        """
+        self.views = views
+        self.stats = stats or {}
+        self.address = address
+        self.port = port
+        self.interval = interval
+        self.metrics: Dict[str, List[str]] = {}
+        self.page = b""
+        self.last_poll: Optional[float] = None
+        self.api: Optional[IxTclHalApi] = None
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self) -> "IxeStatsExporter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def server_port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        """Open the poller TclServer connection, poll once, then start the poller and HTTP server threads."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                page = exporter.page
+                self.send_response(200)
+                self.send_header("Content-Type", exporter.content_type)
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format: str, *args) -> None:
+                logger.debug(f"Stats exporter {self.address_string()} - {format % args}")
+
+        session = IxeObject.session
+        tcl_handler = session.api._tcl_handler
+        self.api = IxTclHalApi(TclClient(session.logger, tcl_handler.host, tcl_handler.port, tcl_handler.rsa_id))
+        self.api._tcl_handler.connect()
+        for view in self.views:
+            view.api = self.api
+        self.poll()
+        self._stop.clear()
+        self._server = ThreadingHTTPServer((self.address, self.port), Handler)
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, name="stats exporter server", daemon=True),
+            threading.Thread(target=self._run, name="stats exporter poller", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Stats exporter serving http://{self.address}:{self.server_port}/metrics")
+
+    def stop(self) -> None:
+        """Stop the poller and HTTP server and close the poller TclServer connection."""
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.api:
+            for view in self.views:
+                view.api = None
+            self.api._tcl_handler.close()
+            self.api = None
+
+    def poll(self) -> None:
+        """Read all views and render the cached page, on failure the previous statistics are kept."""
+        start = time.time()
+        error = 0
+        try:
+            metrics: Dict[str, List[str]] = {}
+            for view in self.views:
+                for name, samples in render_metrics(view.read_stats(*self.stats.get(view, ()))).items():
+                    metrics.setdefault(name, []).extend(samples)
+            self.metrics = metrics
+            self.last_poll = start
+        except Exception as e:
+            logger.error(f"Stats exporter poll failed - {e}")
+            error = 1
+        lines = []
+        for name, samples in self.metrics.items():
+            lines.append(f"# TYPE {name} {'gauge' if name.lower().endswith('rate') else 'untyped'}")
+            lines.extend(samples)
+        lines.append("# TYPE ixexplorer_poll_error gauge")
+        lines.append(f"ixexplorer_poll_error {error}")
+        lines.append("# TYPE ixexplorer_poll_duration_seconds gauge")
+        lines.append(f"ixexplorer_poll_duration_seconds {time.time() - start:.6f}")
+        if self.last_poll is not None:
+            lines.append("# TYPE ixexplorer_poll_timestamp_seconds gauge")
+            lines.append(f"ixexplorer_poll_timestamp_seconds {self.last_poll:.3f}")
+        self.page = ("\n".join(lines) + "\n").encode()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.poll()
@@ -0,0 +1,250 @@
+"""
+Streaming statistics sinks.
+
+Statistics snapshots are queued (bounded queue) and written by a background thread to CSV, JSONL or fixed width binary
+files, with periodic fsync and size based file rotation, so long runs do not accumulate statistics in memory.
+"""
+import csv
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+from collections import OrderedDict
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger("tgn.ixexplorer")
+
+
+class IxeStatsSinkFormat(Enum):
+    csv = 1
+    jsonl = 2
+    binary = 3
+
+
+def flatten_stats(stats: dict, path: tuple = (), rows: Optional[Dict[tuple, dict]] = None) -> Dict[tuple, dict]:
+    """Flatten nested statistics dictionary into {path: {counter: value}} rows.
+
+    :param stats: statistics as returned by IxePortsStats/IxeStreamsStats read_stats.
+    :return: rows, path is (port,) for ports statistics and (stream, "tx") or (stream, "rx", port) for streams statistics.
+    """
+    rows = OrderedDict() if rows is None else rows
+    counters = OrderedDict((c, v) for c, v in stats.items() if not isinstance(v, dict))
+    if counters:
+        rows[path] = counters
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            flatten_stats(value, path + (key,), rows)
+    return rows
+
+
+class IxeStatsSink:
+    """Write statistics snapshots to file from a background thread.
+
+    Formats:
+    csv - timestamp, object, counters... row per object. The counters columns are set at open, or by the first snapshot
+        (or the header of the existing file), and each file has a single header line. When columns are not set at open
+        and a snapshot has new counters, the columns are extended and the file is rotated (as in size rotation), when
+        columns are set at open other counters are ignored.
+    jsonl - {"timestamp": timestamp, "statistics": statistics} line per snapshot.
+    binary - fixed width records <timestamp (double), object ID (uint32), counter ID (uint32), type (char), value (8
+        bytes)>, the value is packed as struct format type - q/Q for integer counters (so 64 bits counters keep their
+        precision) and d for floats. The object and counter names of the IDs are saved in 'file'.names.json, use
+        read_binary_stats to read the file.
+    """
+
+    binary_record = struct.Struct("<dIIc8s")
+
+    def __init__(
+        self,
+        path: Path,
+        sink_format: IxeStatsSinkFormat = IxeStatsSinkFormat.jsonl,
+        max_queue: int = 1024,
+        fsync_interval: float = 5.0,
+        rotate_bytes: Optional[int] = None,
+        backups: int = 5,
+        columns: Optional[List[str]] = None,
+    ) -> None:
+        """Open the sink and start the writer thread.
+
+        :param path: output file path.
+        :param sink_format: output file format.
+        :param max_queue: maximum number of queued snapshots, write blocks when the queue is full.
+        :param fsync_interval: seconds between flush + fsync of the output file.
+        :param rotate_bytes: rotate the output file when it exceeds this size, None - never rotate.
+        :param backups: number of rotated files to keep (path.1 ... path.backups).
+        :param columns: CSV counters columns, if None - set by the first snapshot and extended by new counters.
+        """
+        self.path = Path(path)
+        self.sink_format = sink_format
+        self.fsync_interval = fsync_interval
+        self.rotate_bytes = rotate_bytes
+        self.backups = backups
+        self.columns: Optional[List[str]] = list(columns) if columns else None
+        self._fixed_columns = self.columns is not None
+        self.names: Dict[str, Dict[str, int]] = {"objects": {}, "counters": {}}
+        self.error: Optional[Exception] = None
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self._file = None
+        self._open()
+        self._thread = threading.Thread(target=self._run, name=f"stats sink {self.path.name}", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "IxeStatsSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, statistics: dict, timestamp: Optional[float] = None) -> None:
+        """Queue statistics snapshot for writing, block if the queue is full.
+
+        :param statistics: statistics as returned by read_stats.
+        :param timestamp: snapshot time, if None - current time.
+        :raises RuntimeError: if the sink is closed, or the writer thread exception if the writer failed.
+        """
+        item = (time.time() if timestamp is None else timestamp, statistics)
+        while True:
+            if self.error:
+                raise self.error
+            if not self._thread.is_alive():
+                raise RuntimeError(f"Statistics sink {self.path} is closed")
+            try:
+                self._queue.put(item, timeout=1)
+                return
+            except queue.Full:
+                pass
+
+    def close(self) -> None:
+        """Write all queued snapshots, stop the writer thread and close the file."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self.error:
+            raise self.error
+
+    def _run(self) -> None:
+        last_sync = time.monotonic()
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    break
+                if item:
+                    self._write(*item)
+                if time.monotonic() - last_sync >= self.fsync_interval:
+                    self._sync()
+                    last_sync = time.monotonic()
+                if self.rotate_bytes and self._file.tell() >= self.rotate_bytes:
+                    self._rotate()
+        except Exception as e:
+            logger.error(f"Statistics sink {self.path} failed - {e}")
+            self.error = e
+        finally:
+            self._sync()
+            self._file.close()
+
+    def _open(self) -> None:
+        if self.sink_format is IxeStatsSinkFormat.binary:
+            self._file = open(self.path, "ab")
+        else:
+            self._file = open(self.path, "a", newline="")
+            self._csv = csv.writer(self._file)
+            if self.sink_format is not IxeStatsSinkFormat.csv:
+                return
+            if self._file.tell():
+                # Append to existing file only if its columns match, so the file keeps a single header.
+                with open(self.path, newline="") as f:
+                    file_columns = next(csv.reader(f), [])[2:]
+                if self.columns is None:
+                    self.columns = file_columns
+                elif self.columns != file_columns:
+                    self._rotate()
+            elif self.columns:
+                self._csv.writerow(["timestamp", "object"] + self.columns)
+
+    def _write(self, timestamp: float, statistics: dict) -> None:
+        if self.sink_format is IxeStatsSinkFormat.jsonl:
+            self._file.write(json.dumps({"timestamp": timestamp, "statistics": statistics}) + "\n")
+            return
+        rows = flatten_stats(statistics)
+        if self.sink_format is IxeStatsSinkFormat.csv:
+            columns = list(OrderedDict.fromkeys(c for counters in rows.values() for c in counters))
+            if self.columns is None:
+                self.columns = columns
+                self._csv.writerow(["timestamp", "object"] + self.columns)
+            elif not self._fixed_columns:
+                new_columns = [c for c in columns if c not in self.columns]
+                if new_columns:
+                    self.columns += new_columns
+                    self._rotate()
+            for path, counters in rows.items():
+                self._csv.writerow([timestamp, "|".join(path)] + [counters.get(c, "") for c in self.columns])
+            return
+        names_changed = False
+        records = []
+        for path, counters in rows.items():
+            object_id, new_object = self._name_id("objects", "|".join(path))
+            names_changed |= new_object
+            for counter, value in counters.items():
+                if not isinstance(value, (int, float)):
+                    continue
+                counter_id, new_counter = self._name_id("counters", counter)
+                names_changed |= new_counter
+                value_type = "d" if isinstance(value, float) else "Q" if value >= 0 else "q"
+                value = struct.pack(f"<{value_type}", value)
+                records.append(self.binary_record.pack(timestamp, object_id, counter_id, value_type.encode(), value))
+        self._file.write(b"".join(records))
+        if names_changed:
+            Path(str(self.path) + ".names.json").write_text(json.dumps(self.names, indent=1))
+
+    def _name_id(self, kind: str, name: str) -> tuple:
+        ids = self.names[kind]
+        if name in ids:
+            return ids[name], False
+        ids[name] = len(ids)
+        return ids[name], True
+
+    def _sync(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rotate(self) -> None:
+        self._sync()
+        self._file.close()
+        for index in range(self.backups - 1, 0, -1):
+            backup = Path(f"{self.path}.{index}")
+            if backup.exists():
+                backup.replace(f"{self.path}.{index + 1}")
+        if self.backups:
+            self.path.replace(f"{self.path}.1")
+        else:
+            self.path.unlink()
+        self._open()
+
+
+def read_binary_stats(path: Path) -> Iterator[Tuple[float, str, str, object]]:
+    """Read binary statistics sink file.
+
+    :param path: binary sink file path, the IDs names are read from 'path'.names.json.
+    :return: generator of (timestamp, object, counter, value), value is int for integer counters and float for floats.
+    """
+    names = json.loads(Path(str(path) + ".names.json").read_text())
+    objects = {i: n for n, i in names["objects"].items()}
+    counters = {i: n for n, i in names["counters"].items()}
+    record = IxeStatsSink.binary_record
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(record.size)
+            if len(data) < record.size:
+                return
+            timestamp, object_id, counter_id, value_type, value = record.unpack(data)
+            (value,) = struct.unpack(f"<{value_type.decode()}", value)
+            yield timestamp, objects[object_id], counters[counter_id], value
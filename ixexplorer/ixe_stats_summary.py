@@ -0,0 +1,230 @@
+"""
+Vectorized traffic accounting over streams statistics.
+
+Streams statistics are loaded once into numpy columns - TX counters per stream and RX counters per stream x RX port -
+directly from the bulk reads of a streams statistics view (from_view), so per stream and aggregate loss, latency,
+sequence errors and throughput are computed as array operations. Not available counters (-1, e.g. ports that do not
+receive the stream) are ignored.
+"""
+from collections import OrderedDict
+from fnmatch import fnmatch
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+import numpy as np
+
+
+class IxeStreamsSummary:
+    """Streams statistics as columns."""
+
+    # Statistics read by from_view.
+    tx_counters = ["framesSent", "frameRate"]
+    rx_counters = [
+        "totalFrames",
+        "minLatency",
+        "averageLatency",
+        "maxLatency",
+        "totalSequenceError",
+        "smallSequenceError",
+        "bigSequenceError",
+        "reverseSequenceError",
+        "frameRate",
+        "bitRate",
+    ]
+
+    def __init__(
+        self, statistics: dict, group_ids: Optional[Dict[str, int]] = None, tx_ports: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Load streams statistics dictionaries into columns, use from_view to load the statistics without dictionaries.
+
+        :param statistics: streams statistics {stream: {"tx": {counter: value}, "rx": {port: {counter: value}}}}, as
+            returned by IxeStreamsStats.read_stats.
+        :param group_ids: packet group ID per stream {stream: group ID}, streams without group ID get -1.
+        :param tx_ports: TX port per stream {stream: port}, streams without TX port get empty TX port.
+        """
+        group_ids = group_ids or {}
+        tx_ports = tx_ports or {}
+        self.streams = np.array(list(statistics), dtype=object)
+        self.tx_ports = np.array([str(tx_ports.get(s, "")) for s in self.streams], dtype=object)
+        self.group_ids = np.array([group_ids.get(s, -1) for s in self.streams], dtype=np.int64)
+        ports = OrderedDict.fromkeys(p for stream_stats in statistics.values() for p in stream_stats["rx"])
+        self.ports = np.array(list(ports), dtype=object)
+        tx_counters = OrderedDict.fromkeys(c for stream_stats in statistics.values() for c in stream_stats["tx"])
+        rx_counters = OrderedDict.fromkeys(
+            c for stream_stats in statistics.values() for port_stats in stream_stats["rx"].values() for c in port_stats
+        )
+        self.tx = {
+            c: np.array([s["tx"].get(c, -1) for s in statistics.values()], dtype=np.float64).reshape(len(self.streams))
+            for c in tx_counters
+        }
+        rx_values = np.array(
+            [[[s["rx"].get(p, {}).get(c, -1) for c in rx_counters] for p in self.ports] for s in statistics.values()],
+            dtype=np.float64,
+        ).reshape(len(self.streams), len(self.ports), len(rx_counters))
+        self.rx = {c: rx_values[:, :, i] for i, c in enumerate(rx_counters)}
+
+    @classmethod
+    def from_view(cls, view) -> "IxeStreamsSummary":
+        """Read the statistics of streams statistics view directly into columns, see IxeStreamsStats.read_arrays.
+
+        Rates are the chassis rates (see IxeStreamsStats.read_stats chassis_rates).
+
+        :param view: IxeStreamsStats.
+        """
+        streams, tx_values, rx_values = view.read_arrays(cls.tx_counters, cls.rx_counters)
+        return cls.from_arrays(
+            streams=[view.pg_index.names[s] for s in streams],
+            tx_ports=[str(p) for p, p_streams in view.tx_ports_streams.items() for _ in p_streams],
+            group_ids=[view.pg_index.group_ids[s] for s in streams],
+            ports=[str(p) for p in view.rx_ports],
+            tx={c: tx_values[:, i] for i, c in enumerate(cls.tx_counters)},
+            rx={c: rx_values[:, :, i] for i, c in enumerate(cls.rx_counters)},
+        )
+
+    @classmethod
+    def from_arrays(
+        cls,
+        streams: Iterable[str],
+        tx_ports: Iterable[str],
+        group_ids: Iterable[int],
+        ports: Iterable[str],
+        tx: Dict[str, np.ndarray],
+        rx: Dict[str, np.ndarray],
+    ) -> "IxeStreamsSummary":
+        """Create summary from columns.
+
+        :param streams: streams names.
+        :param tx_ports: TX port of each stream.
+        :param group_ids: packet group ID of each stream.
+        :param ports: RX ports names.
+        :param tx: TX counters {counter: array of streams}.
+        :param rx: RX counters {counter: 2-D array of streams x RX ports}.
+        """
+        summary = object.__new__(cls)
+        summary.streams = np.array(list(streams), dtype=object)
+        summary.tx_ports = np.array(list(tx_ports), dtype=object)
+        summary.group_ids = np.array(list(group_ids), dtype=np.int64)
+        summary.ports = np.array(list(ports), dtype=object)
+        summary.tx = {c: np.asarray(v, dtype=np.float64) for c, v in tx.items()}
+        summary.rx = {c: np.asarray(v, dtype=np.float64) for c, v in rx.items()}
+        return summary
+
+    def __len__(self) -> int:
+        return len(self.streams)
+
+    def select(
+        self,
+        tx_ports: Optional[Iterable[str]] = None,
+        rx_ports: Optional[Iterable[str]] = None,
+        streams: Optional[Union[str, Iterable[str]]] = None,
+        groups: Optional[Tuple[int, int]] = None,
+    ) -> "IxeStreamsSummary":
+        """Return summary of the selected streams and RX ports.
+
+        :param tx_ports: select streams transmitted from these ports.
+        :param rx_ports: count only RX statistics of these ports.
+        :param streams: select streams by name - glob pattern (e.g. "voice-*") or list of names.
+        :param groups: select streams by packet group IDs range (first, last), inclusive.
+        """
+        rows = np.ones(len(self), dtype=bool)
+        if tx_ports is not None:
+            rows &= np.isin(self.tx_ports, [str(p) for p in tx_ports])
+        if streams is not None:
+            if isinstance(streams, str):
+                rows &= np.array([fnmatch(s, streams) for s in self.streams], dtype=bool)
+            else:
+                rows &= np.isin(self.streams, [str(s) for s in streams])
+        if groups is not None:
+            rows &= (self.group_ids >= groups[0]) & (self.group_ids <= groups[1])
+        columns = np.ones(len(self.ports), dtype=bool)
+        if rx_ports is not None:
+            columns = np.isin(self.ports, [str(p) for p in rx_ports])
+
+        return self.from_arrays(
+            self.streams[rows],
+            self.tx_ports[rows],
+            self.group_ids[rows],
+            self.ports[columns],
+            {c: v[rows] for c, v in self.tx.items()},
+            {c: v[rows][:, columns] for c, v in self.rx.items()},
+        )
+
+    def _tx(self, counter: str) -> np.ndarray:
+        values = self.tx.get(counter, np.full(len(self), -1.0))
+        return np.where(values >= 0, values, 0)
+
+    def _rx(self, counter: str) -> np.ndarray:
+        """Return RX counter masked array (streams x ports), not available values are masked."""
+        values = self.rx.get(counter, np.full((len(self), len(self.ports)), -1.0))
+        return np.ma.masked_less(values, 0)
+
+    def _sequence_errors(self) -> np.ndarray:
+        """Return sequence errors per stream, totalSequenceError where available, else the sum of the error types."""
+        total = self._rx("totalSequenceError")
+        types = sum(self._rx(c).filled(0) for c in ["smallSequenceError", "bigSequenceError", "reverseSequenceError"])
+        return np.where(np.ma.getmaskarray(total), types, total.filled(0)).sum(axis=1)
+
+    def per_stream(self) -> Dict[str, np.ndarray]:
+        """Return per stream summary columns.
+
+        Latencies are in the chassis latency units, average latency is weighted by the RX frames of each port. Rates are
+        the sums over the RX ports. Values that are not available for a stream are NaN.
+
+        :return: {column: array}, columns - stream, tx_port, group_id, tx_frames, rx_frames, loss, loss_percent,
+            min_latency, avg_latency, max_latency, sequence_errors, tx_frame_rate, rx_frame_rate, rx_bit_rate.
+        """
+        tx_frames = self._tx("framesSent")
+        rx_frames_ports = self._rx("totalFrames")
+        rx_frames = rx_frames_ports.sum(axis=1).filled(0)
+        loss = tx_frames - rx_frames
+        with np.errstate(divide="ignore", invalid="ignore"):
+            loss_percent = np.where(tx_frames > 0, loss * 100 / tx_frames, np.nan)
+        weights = np.ma.masked_array(rx_frames_ports.filled(0), mask=np.ma.getmaskarray(self._rx("averageLatency")))
+        weighted = (self._rx("averageLatency") * weights).sum(axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_latency = (weighted / weights.sum(axis=1)).filled(np.nan)
+        return OrderedDict(
+            stream=self.streams,
+            tx_port=self.tx_ports,
+            group_id=self.group_ids,
+            tx_frames=tx_frames,
+            rx_frames=rx_frames,
+            loss=loss,
+            loss_percent=loss_percent,
+            min_latency=self._rx("minLatency").min(axis=1).filled(np.nan),
+            avg_latency=avg_latency,
+            max_latency=self._rx("maxLatency").max(axis=1).filled(np.nan),
+            sequence_errors=self._sequence_errors(),
+            tx_frame_rate=self._tx("frameRate"),
+            rx_frame_rate=self._rx("frameRate").sum(axis=1).filled(0),
+            rx_bit_rate=self._rx("bitRate").sum(axis=1).filled(0),
+        )
+
+    def aggregate(self) -> Dict[str, float]:
+        """Return summary of all streams.
+
+        :return: {column: value}, columns as per_stream without stream, tx_port and group_id.
+        """
+        per_stream = self.per_stream()
+        tx_frames, rx_frames = per_stream["tx_frames"].sum(), per_stream["rx_frames"].sum()
+        weights = np.where(np.isnan(per_stream["avg_latency"]), 0, per_stream["rx_frames"])
+        return OrderedDict(
+            tx_frames=float(tx_frames),
+            rx_frames=float(rx_frames),
+            loss=float(tx_frames - rx_frames),
+            loss_percent=float((tx_frames - rx_frames) * 100 / tx_frames) if tx_frames > 0 else float("nan"),
+            min_latency=_nan_reduce(np.min, per_stream["min_latency"]),
+            avg_latency=(
+                float(np.nansum(per_stream["avg_latency"] * weights) / weights.sum()) if weights.sum() > 0 else float("nan")
+            ),
+            max_latency=_nan_reduce(np.max, per_stream["max_latency"]),
+            sequence_errors=float(per_stream["sequence_errors"].sum()),
+            tx_frame_rate=float(per_stream["tx_frame_rate"].sum()),
+            rx_frame_rate=float(per_stream["rx_frame_rate"].sum()),
+            rx_bit_rate=float(per_stream["rx_bit_rate"].sum()),
+        )
+
+
+def _nan_reduce(reduce, values: np.ndarray) -> float:
+    """Reduce the values that are not NaN, NaN if all values are NaN."""
+    values = values[~np.isnan(values)]
+    return float(reduce(values)) if len(values) else float("nan")
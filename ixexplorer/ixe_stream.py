@@ -69,10 +69,13 @@ class IxeStream(IxeObject, metaclass=ixe_obj_meta):
     __tcl_commands__ = ["export", "write"]
 
     next_group_id = 0
+    # Incremented whenever streams are created, removed or their configuration (name, packet group...) changes.
+    generation = 0
 
     def __init__(self, parent, uri):
         super().__init__(parent=parent, uri=uri.replace("/", " "))
         self.rx_ports = []
+        IxeStream.generation += 1
 
     def create(self, name: str) -> None:
         self.ix_set_default()
@@ -88,7 +91,13 @@ class IxeStream(IxeObject, metaclass=ixe_obj_meta):
     def remove(self) -> None:
         self.ix_command("remove")
         self.ix_command("write")
+        self._set_dirty()
         self.del_object_from_parent()
+        IxeStream.generation += 1
+
+    def _set_dirty(self, scope: str = "config") -> None:
+        super()._set_dirty(scope)
+        IxeStream.generation += 1
 
     def ix_set_default(self) -> None:
         super().ix_set_default()
@@ -96,7 +105,8 @@ class IxeStream(IxeObject, metaclass=ixe_obj_meta):
             stream_object.ix_set_default()
 
     def read_stats(self, *stats):
-        return IxeStreamsStats(self).read_stats(*stats)[str(self)]
+        streams_stats = IxeStreamsStats(self)
+        return streams_stats.read_stats(*stats)[streams_stats.pg_index.names[self]]
 
     #
     # Stream objects.
@@ -194,6 +204,7 @@ class IxeStreamObj(IxeObjectObj):
     def ix_command(self, command, *args, **kwargs):
         rc = self.api.call(("{} {}" + len(args) * " {}").format(self.__tcl_command__, command, *args))
         self.ix_set()
+        self._set_dirty()
         return rc
 
 
@@ -19,8 +19,8 @@ def ixia(sut_utils: IxeSutUtils) -> Iterable[IxeApp]:
     """Yield connected Ixia object."""
     ixia = sut_utils.ixia()
     yield ixia
-    for port in ixia.session.ports.values():
-        port.release()
+    if ixia.session.ports:
+        ixia.session.release_ports()
     ixia.disconnect()
 
 
@@ -2,15 +2,33 @@
 ixexplorer package tests that can run in offline mode.
 """
 import json
+import struct
+from collections import OrderedDict
 from pathlib import Path
 from typing import List
 
+import numpy as np
 import pytest
 
+from ixexplorer.api.ixapi import IxTclHalApi, split_tcl_list, tcl_quote
 from ixexplorer.ixe_app import IxeApp
+from ixexplorer.ixe_cap_analysis import IxeCapColumns
+from ixexplorer.ixe_capture import (
+    PCAP_LINKTYPE_ETHERNET,
+    PCAP_MAGIC_NS,
+    PCAP_SNAPLEN,
+    IxeCapFrame,
+    _parse_timestamp,
+    read_cap_file,
+    write_pcap,
+)
 from ixexplorer.ixe_object import IxeObject
-from ixexplorer.ixe_port import IxeReceiveMode
-from tests import _load_configs
+from ixexplorer.ixe_port import IxeReceiveMode, IxeTransmitMode
+from ixexplorer.ixe_statistics_view import IxePgIndex, IxePortsStats, IxeStreamsStats, StatsDelta
+from ixexplorer.ixe_stats_exporter import render_metrics
+from ixexplorer.ixe_stats_sink import IxeStatsSink, IxeStatsSinkFormat, read_binary_stats
+from ixexplorer.ixe_stats_summary import IxeStreamsSummary
+from tests import IxeSutUtils, _load_configs
 
 
 # pylint: disable=unused-argument
@@ -225,3 +243,395 @@ def test_wrf(ixia: IxeApp, locations: List[str]) -> None:
         stream.weightedRandomFramesize.delPair(64, 1)
         stream.write()
     port.write()
+
+
+def test_port_features(ixia: IxeApp, locations: List[str], tmp_path: Path) -> None:
+    """Test port features cache."""
+    ixia.session.add_ports(*locations)
+    port = ixia.session.ports[locations[0]]
+    assert port.port_type
+    assert port.is_valid_feature("portFeatureRxDataIntegrity") == bool(int(port.isValidFeature("portFeatureRxDataIntegrity")))
+    assert port.get_feature("ethernetLineRate") == port.getFeature("ethernetLineRate")
+
+    ixia.session.port_features.save(tmp_path.joinpath("features.json"))
+    ixia.session.port_features.types = {}
+    ixia.session.port_features.load(tmp_path.joinpath("features.json"))
+    assert port.port_type in ixia.session.port_features.types
+
+
+def test_inventory_snapshot(ixia: IxeApp, sut_utils: IxeSutUtils, tmp_path: Path) -> None:
+    """Test chassis inventory snapshot save and load."""
+    ixia.discover()
+    chassis = list(ixia.chassis_chain.values())[0]
+    ports = [p.uri for c in chassis.cards.values() for p in c.ports.values()]
+    ixia.save_inventory(tmp_path.joinpath("inventory.json"))
+
+    ixia_warm = sut_utils.ixia()
+    try:
+        assert ixia_warm.load_inventory(tmp_path.joinpath("inventory.json"))
+        chassis_warm = list(ixia_warm.chassis_chain.values())[0]
+        assert [p.uri for c in chassis_warm.cards.values() for p in c.ports.values()] == ports
+    finally:
+        ixia_warm.disconnect()
+
+
+def test_apply(ixia: IxeApp, locations: List[str]) -> None:
+    """Test declarative configuration apply."""
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
+
+    spec = {
+        locations[0]: {
+            "receive_modes": [IxeReceiveMode.widePacketGroup],
+            "streams": {
+                1: {"da": "22:22:22:22:22:11", "framesize": 128, "ip": {"destIpAddr": "1.1.1.2"}},
+                2: {"da": "22:22:22:22:22:22", "packetGroup": {"groupId": 7}},
+            },
+        }
+    }
+    changes = ixia.session.apply(spec)
+    assert changes
+    port = ixia.session.ports[locations[0]]
+    assert not port.dirty
+    assert port.streams[1].framesize == 128
+    assert port.streams[1].ip.destIpAddr == "1.1.1.2"
+    assert port.streams[2].packetGroup.groupId == 7
+
+    assert not ixia.session.apply(spec)
+
+
+def test_load_config_cache(ixia: IxeApp, locations: List[str], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that loading the same configuration again is skipped unless the port changed."""
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
+    port = ixia.session.ports[locations[0]]
+    cfg = Path(__file__).parent.joinpath("configs/test_config_1.prt")
+    port.load_config(cfg)
+    assert port.loaded_config
+
+    calls = []
+    api_call = port.api.call
+    monkeypatch.setattr(port.api, "call", lambda cmd, *args: calls.append(cmd) or api_call(cmd, *args))
+    port.load_config(cfg)
+    assert port.loaded_config
+    assert not calls
+
+    port.streams[1].da = "33:33:33:33:33:33"
+    assert not port.loaded_config
+    calls.clear()
+    port.load_config(cfg)
+    assert [c for c in calls if "port import" in c]
+    assert port.streams[1].da == "22:22:22:22:22:11"
+
+
+def test_dirty_tracking(ixia: IxeApp, locations: List[str]) -> None:
+    """Test that ports changed by setters, setDefault and helpers are written, and raw calls need force."""
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
+    port = ixia.session.ports[locations[0]]
+    ixia.session.write_ports(force=True)
+    assert not port.dirty
+
+    port.autoDetectInstrumentation.ix_set_default()
+    assert port.dirty == {"config"}
+    ixia.session.write_ports()
+    assert not port.dirty
+
+    port.clear_port_stats()
+    assert not port.dirty
+
+    port.set_transmit_mode(IxeTransmitMode.advancedScheduler.value)
+    assert "port" in port.dirty
+    ixia.session.write_ports()
+
+    port.api.call(f"port get {port.uri}; port config -loopback 1; port set {port.uri}")
+    assert not port.dirty
+    ixia.session.write_ports(port, force=True)
+    port.ix_get(force=True)
+    assert port.loopback == "1"
+
+
+def test_split_tcl_list() -> None:
+    """Test local Tcl list parsing."""
+    assert split_tcl_list("") == []
+    assert split_tcl_list("a b  c") == ["a", "b", "c"]
+    assert split_tcl_list("{} a {}") == ["", "a", ""]
+    assert split_tcl_list('"" "a b" x') == ["", "a b", "x"]
+    assert split_tcl_list("{a b} {c {d e}}") == ["a b", "c {d e}"]
+    assert split_tcl_list(split_tcl_list("{a b} {c {d e}}")[1]) == ["c", "d e"]
+    assert split_tcl_list(r"a\ b c\{ \} x\\") == ["a b", "c{", "}", "x\\"]
+    assert split_tcl_list(r'"a\"b" "c\nd"') == ['a"b', "c\nd"]
+    assert split_tcl_list("{a \\} b}") == ["a \\} b"]
+
+
+def test_call_script_quoting() -> None:
+    """Test that call_script passes every parameter to the script as a single Tcl word."""
+
+    class RecordingHandler:
+        def call(self, cmd: str, *args: object) -> str:
+            self.cmd = cmd % args
+            return ""
+
+    values = ["", "a b", "a}b", "{a", "a\\", "{a b} {c}", 'a"b', "$a [b] ;c", "a\nb", "x%y"]
+    handler = RecordingHandler()
+    api = IxTclHalApi(handler)
+    for value in values:
+        assert split_tcl_list(tcl_quote(value)) == [value]
+        api.call_script("return $p", p=value)
+        assert split_tcl_list(handler.cmd)[2] == value
+
+    tkinter = pytest.importorskip("tkinter")
+    tcl = tkinter.Tcl()
+    for value in values:
+        api.call_script("return $p", p=value)
+        assert tcl.eval(handler.cmd) == value
+
+
+def test_read_cap_file(tmp_path: Path) -> None:
+    """Test local txt capture file parsing."""
+    cap_file = tmp_path.joinpath("capture.txt")
+    cap_file.write_text(
+        "Frame\tTime Stamp\tDA\tSA\tLength\tStatus\tData\n"
+        "1\t00:00:01.000000500\t00 01 02 03 04 05\t0A 0B 0C 0D 0E 0F\t64\t0\t08 00  45\n"
+        "2\t1:02:03.5\t00 01 02 03 04 05\t0A 0B 0C 0D 0E 0F\tN/A\t0\t\n"
+    )
+    frames = list(read_cap_file(cap_file, batch_size=1))
+    assert [f.index for f in frames] == [1, 2]
+    assert frames[0].timestamp == 1_000_000_500
+    assert frames[0].length == 64
+    assert frames[0].data == bytes.fromhex("000102030405 0A0B0C0D0E0F 080045")
+    assert frames[1].length == len(frames[1].data) == 12
+
+    assert _parse_timestamp("123") == 123
+    assert _parse_timestamp("01:02:03.000.000.009") == 3723_000_000_009
+    assert _parse_timestamp("2.5") == 2_500_000_000
+    assert _parse_timestamp("N/A") is None
+
+    with pytest.raises(ValueError):
+        read_cap_file(tmp_path.joinpath("capture.enc"))
+
+
+def test_cap_columns() -> None:
+    """Test vectorized captured frames analysis."""
+    group_id_offset, sequence_offset = 40, 44
+
+    def frame(number: int, group_id: int, sequence: int, length: int = 64) -> IxeCapFrame:
+        data = bytes(group_id_offset) + group_id.to_bytes(4, "big") + sequence.to_bytes(4, "big")
+        return IxeCapFrame(number, number * 100, length, 0, data.ljust(length, b"\0")[:length])
+
+    frames = [frame(1, 7, 0), frame(2, 3, 10), frame(3, 7, 1), frame(4, 7, 3), frame(5, 3, 11), frame(6, 5, 0)]
+    columns = IxeCapColumns(frames, snap_len=64)
+    assert len(columns) == 6
+    assert columns.group_id(group_id_offset).tolist() == [7, 3, 7, 7, 3, 5]
+    assert columns.inter_arrival().tolist() == [100] * 5
+    assert columns.flow_counts((group_id_offset, 4)) == {(3,): 2, (5,): 1, (7,): 3}
+    gaps = columns.sequence_gaps(group_id_offset, sequence_offset)
+    assert list(gaps) == [3, 5, 7]
+    assert [gaps[g].tolist() for g in gaps] == [[], [], [4]]
+    assert IxeCapColumns([]).sequence_gaps(group_id_offset, sequence_offset) == {}
+
+    for offset, size in [(0, 0), (0, 9), (-1, 2), (63, 2)]:
+        with pytest.raises(ValueError):
+            columns.field(offset, size)
+    with pytest.raises(ValueError):
+        IxeCapColumns(frames + [frame(7, 7, 4, length=46)], snap_len=64).field(sequence_offset, 4)
+
+
+def test_write_pcap(tmp_path: Path) -> None:
+    """Test streaming frames into nanosecond pcap file."""
+    frames = [IxeCapFrame(1, 1_000_000_005, 64, 0, bytes(range(60))), IxeCapFrame(2, 2_500_000_000, 68, 0, b"\x01" * 64)]
+    pcap_file = tmp_path.joinpath("capture.pcap")
+    assert write_pcap(pcap_file, iter(frames)) == 2
+    data = pcap_file.read_bytes()
+    magic, major, minor, _, _, snaplen, link_type = struct.unpack_from("<IHHiIII", data)
+    assert (magic, major, minor, snaplen, link_type) == (PCAP_MAGIC_NS, 2, 4, PCAP_SNAPLEN, PCAP_LINKTYPE_ETHERNET)
+    offset = 24
+    for frame in frames:
+        seconds, nanoseconds, captured, length = struct.unpack_from("<IIII", data, offset)
+        assert seconds * 1_000_000_000 + nanoseconds == frame.timestamp
+        assert (captured, length) == (len(frame.data), frame.length)
+        assert data[offset + 16 : offset + 16 + captured] == frame.data
+        offset += 16 + captured
+    assert offset == len(data)
+
+
+def test_stats_delta() -> None:
+    """Test counters deltas arithmetic - wrap, restart and clear of a single port."""
+
+    class FakePort:
+        def __init__(self, name: str) -> None:
+            self.name = name
+            self.stats_generation = 0
+            self.rx_ports = []
+
+        def __str__(self) -> str:
+            return self.name
+
+    port1, port2 = FakePort("P1"), FakePort("P2")
+    counters = {port1: {"framesSent": 100, "bytesSent": 1000}, port2: {"framesSent": 200, "bytesSent": 2000}}
+    ports_stats = IxePortsStats(port1, port2)
+    ports_stats.read_stats = lambda *stats: OrderedDict(
+        (str(p), OrderedDict(v, lineSpeed=1000, framesSentRate=10)) for p, v in counters.items()
+    )
+    delta = StatsDelta(ports_stats, counter_bits={"framesSent": 32})
+    assert delta.read() == {("P1",): counters[port1], ("P2",): counters[port2]}
+    assert delta.read() == {}
+
+    counters[port1]["framesSent"] = 150
+    counters[port2]["framesSent"] = 260
+    assert delta.read() == {("P1",): {"framesSent": 50}, ("P2",): {"framesSent": 60}}
+
+    # Clearing P1 restarts only P1 counters.
+    port1.stats_generation += 1
+    counters[port1].update(framesSent=10, bytesSent=100)
+    counters[port2]["framesSent"] = 300
+    assert delta.read() == {("P1",): {"framesSent": 10, "bytesSent": 100}, ("P2",): {"framesSent": 40}}
+
+    # 32 bits counter wraps, 64 bits counter that went back restarted.
+    counters[port2].update(framesSent=5, bytesSent=500)
+    counters[port1]["framesSent"] = 2**32 - 10
+    assert delta.read() == {("P1",): {"framesSent": 2**32 - 20}, ("P2",): {"framesSent": 2**32 - 295, "bytesSent": 500}}
+
+    tx_port, rx_port = FakePort("TX"), FakePort("RX")
+    stream1, stream2 = FakePort("S1"), FakePort("S2")
+    stream2.rx_ports = [tx_port]
+    streams_stats = IxeStreamsStats.__new__(IxeStreamsStats)
+    streams_stats.tx_ports_streams = {tx_port: [stream1, stream2]}
+    streams_stats.rx_ports = [rx_port]
+    streams_stats.pg_index = IxePgIndex()
+    streams_stats.pg_index.key = "streams"
+    streams_stats.pg_index.names = {stream1: "stream-1", stream2: "stream-2"}
+    sent, received = {stream1: 100, stream2: 200}, {stream1: 90}
+
+    def read_arrays(tx_stats: List[str], rx_stats: List[str]) -> tuple:
+        streams = [stream1, stream2]
+        tx_values = np.array([[sent[s]] * len(tx_stats) for s in streams], dtype=np.int64)
+        rx_values = np.full((2, 1, len(rx_stats)), -1, dtype=np.int64)
+        rx_values[0, 0] = received[stream1]
+        return streams, tx_values, rx_values
+
+    streams_stats.read_arrays = read_arrays
+    delta = StatsDelta(streams_stats)
+    assert delta.read("framesSent", "totalFrames") == {
+        ("stream-1", "tx"): {"framesSent": 100},
+        ("stream-2", "tx"): {"framesSent": 200},
+        ("stream-1", "rx", "RX"): {"totalFrames": 90},
+    }
+
+    # Clearing the RX port restarts only the RX rows.
+    rx_port.stats_generation += 1
+    sent.update({stream1: 150, stream2: 250})
+    received[stream1] = 5
+    assert delta.read("framesSent", "totalFrames") == {
+        ("stream-1", "tx"): {"framesSent": 50},
+        ("stream-2", "tx"): {"framesSent": 50},
+        ("stream-1", "rx", "RX"): {"totalFrames": 5},
+    }
+
+
+def test_stats_sink(tmp_path: Path) -> None:
+    """Test statistics sink formats and rotation."""
+    statistics = OrderedDict(
+        [("S1", OrderedDict(tx=OrderedDict(framesSent=2**63 + 1), rx=OrderedDict(P2=OrderedDict(totalFrames=-1))))]
+    )
+    jsonl_file = tmp_path.joinpath("stats.jsonl")
+    with IxeStatsSink(jsonl_file) as sink:
+        sink.write(statistics, timestamp=1.5)
+    assert json.loads(jsonl_file.read_text()) == {"timestamp": 1.5, "statistics": statistics}
+    with pytest.raises(RuntimeError):
+        sink.write(statistics)
+
+    binary_file = tmp_path.joinpath("stats.bin")
+    with IxeStatsSink(binary_file, IxeStatsSinkFormat.binary) as sink:
+        sink.write(statistics, timestamp=1.5)
+        sink.write({"P1": {"frameRate": 0.25}}, timestamp=2.5)
+    assert list(read_binary_stats(binary_file)) == [
+        (1.5, "S1|tx", "framesSent", 2**63 + 1),
+        (1.5, "S1|rx|P2", "totalFrames", -1),
+        (2.5, "P1", "frameRate", 0.25),
+    ]
+
+    csv_file = tmp_path.joinpath("stats.csv")
+    with IxeStatsSink(csv_file, IxeStatsSinkFormat.csv) as sink:
+        sink.write({"P1": {"framesSent": 1}}, timestamp=1)
+        sink.write({"P1": {"framesSent": 2}}, timestamp=2)
+        sink.write({"P1": {"framesSent": 3, "framesReceived": 4}}, timestamp=3)
+    assert tmp_path.joinpath("stats.csv.1").read_text().splitlines() == ["timestamp,object,framesSent", "1,P1,1", "2,P1,2"]
+    assert csv_file.read_text().splitlines() == ["timestamp,object,framesSent,framesReceived", "3,P1,3,4"]
+    # Reopen with the same columns appends without header, fixed columns ignore other counters.
+    with IxeStatsSink(csv_file, IxeStatsSinkFormat.csv, columns=["framesSent", "framesReceived"]) as sink:
+        sink.write({"P1": {"framesSent": 5, "bytesSent": 6}}, timestamp=4)
+    assert csv_file.read_text().splitlines()[1:] == ["3,P1,3,4", "4,P1,5,"]
+    with IxeStatsSink(csv_file, IxeStatsSinkFormat.csv, columns=["bytesSent"], backups=1) as sink:
+        sink.write({"P1": {"framesSent": 5, "bytesSent": 6}}, timestamp=5)
+    assert csv_file.read_text().splitlines() == ["timestamp,object,bytesSent", "5,P1,6"]
+    assert tmp_path.joinpath("stats.csv.1").read_text().splitlines()[0] == "timestamp,object,framesSent,framesReceived"
+
+    with IxeStatsSink(csv_file, IxeStatsSinkFormat.csv, rotate_bytes=1, backups=2) as sink:
+        for timestamp in range(6, 10):
+            sink.write({"P1": {"bytesSent": timestamp}}, timestamp=timestamp)
+    assert csv_file.read_text().splitlines() == ["timestamp,object,bytesSent"]
+    assert tmp_path.joinpath("stats.csv.1").read_text().splitlines() == ["timestamp,object,bytesSent", "9,P1,9"]
+    assert tmp_path.joinpath("stats.csv.2").read_text().splitlines() == ["timestamp,object,bytesSent", "8,P1,8"]
+    assert not tmp_path.joinpath("stats.csv.3").exists()
+
+
+def test_render_metrics() -> None:
+    """Test rendering statistics into Prometheus samples."""
+    ports_statistics = {"1/1/1": {"framesSent": 3, "link": True, "linkFaultState": "noFault", "frameRate_rate": 1.5}}
+    assert render_metrics(ports_statistics) == {
+        "ixexplorer_port_framesSent": ['ixexplorer_port_framesSent{port="1/1/1"} 3'],
+        "ixexplorer_port_frameRate_rate": ['ixexplorer_port_frameRate_rate{port="1/1/1"} 1.5'],
+    }
+    streams_statistics = {
+        'a "b"\\c': {"tx": {"framesSent": 10}, "rx": {"1/1/1": {"totalFrames": -1}, "1/1/2": {"totalFrames": 9}}}
+    }
+    assert render_metrics(streams_statistics) == {
+        "ixexplorer_stream_tx_framesSent": ['ixexplorer_stream_tx_framesSent{stream="a \\"b\\"\\\\c"} 10'],
+        "ixexplorer_stream_rx_totalFrames": ['ixexplorer_stream_rx_totalFrames{stream="a \\"b\\"\\\\c",port="1/1/2"} 9'],
+    }
+
+
+def test_streams_summary() -> None:
+    """Test vectorized streams statistics summary."""
+    summary = IxeStreamsSummary.from_arrays(
+        streams=["a", "b", "c"],
+        tx_ports=["P1", "P1", "P2"],
+        group_ids=[0, 1, 2],
+        ports=["P1", "P2"],
+        tx={"framesSent": np.array([10, 20, 0]), "frameRate": np.array([1, 2, 0])},
+        rx={
+            "totalFrames": np.array([[-1, 10], [-1, 15], [-1, -1]]),
+            "minLatency": np.array([[-1, 50], [-1, 60], [-1, -1]]),
+            "averageLatency": np.array([[-1, 100], [-1, 200], [-1, -1]]),
+            "maxLatency": np.array([[-1, 150], [-1, 300], [-1, -1]]),
+            "totalSequenceError": np.array([[-1, 1], [-1, -1], [-1, -1]]),
+            "smallSequenceError": np.array([[-1, 7], [-1, 2], [-1, -1]]),
+            "bigSequenceError": np.array([[-1, 7], [-1, 3], [-1, -1]]),
+        },
+    )
+    per_stream = summary.per_stream()
+    assert list(per_stream["stream"]) == ["a", "b", "c"]
+    assert per_stream["rx_frames"].tolist() == [10, 15, 0]
+    assert per_stream["loss"].tolist() == [0, 5, 0]
+    np.testing.assert_equal(per_stream["loss_percent"], [0, 25, np.nan])
+    np.testing.assert_equal(per_stream["min_latency"], [50, 60, np.nan])
+    np.testing.assert_equal(per_stream["avg_latency"], [100, 200, np.nan])
+    np.testing.assert_equal(per_stream["max_latency"], [150, 300, np.nan])
+    assert per_stream["sequence_errors"].tolist() == [1, 5, 0]
+    assert per_stream["rx_frame_rate"].tolist() == [0, 0, 0]
+
+    aggregate = summary.aggregate()
+    assert (aggregate["tx_frames"], aggregate["rx_frames"], aggregate["loss"]) == (30, 25, 5)
+    assert aggregate["loss_percent"] == pytest.approx(100 / 6)
+    assert (aggregate["min_latency"], aggregate["avg_latency"], aggregate["max_latency"]) == (50, 160, 300)
+    assert (aggregate["sequence_errors"], aggregate["tx_frame_rate"]) == (6, 3)
+
+    port1_streams = summary.select(tx_ports=["P1"], rx_ports=["P2"])
+    assert list(port1_streams.streams) == ["a", "b"]
+    assert list(port1_streams.ports) == ["P2"]
+    assert port1_streams.aggregate()["rx_frames"] == 25
+    assert list(summary.select(streams="[bc]").streams) == ["b", "c"]
+    assert list(summary.select(streams=["a", "c"]).streams) == ["a", "c"]
+    assert list(summary.select(groups=(1, 5)).group_ids) == [1, 2]
+    assert summary.select(rx_ports=["P1"]).aggregate()["rx_frames"] == 0
@@ -6,14 +6,19 @@ Two Ixia ports connected back to back.
 """
 import json
 import time
+import urllib.request
 from pathlib import Path
 from typing import List
 
 import pytest
 
 from ixexplorer.ixe_app import IxeApp
+from ixexplorer.ixe_cap_analysis import IxeCapColumns
 from ixexplorer.ixe_port import StreamWarningsError
-from ixexplorer.ixe_statistics_view import IxeCapFileFormat, IxePortsStats, IxeStreamsStats
+from ixexplorer.ixe_statistics_view import IxeCapFileFormat, IxePortsStats, IxeStreamsStats, StatsDelta
+from ixexplorer.ixe_stats_exporter import IxeStatsExporter
+from ixexplorer.ixe_stats_sink import IxeStatsSink, IxeStatsSinkFormat
+from ixexplorer.ixe_stats_summary import IxeStreamsSummary
 from tests import _load_configs
 
 
@@ -21,7 +26,8 @@ def test_port_stats(ixia: IxeApp, locations: List[str]) -> None:
     """Test port statistics."""
     print(test_port_stats.__doc__)
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
     cfg1 = Path(__file__).parent.joinpath("configs/test_config_1.prt")
     cfg2 = Path(__file__).parent.joinpath("configs/test_config_2.prt")
     _load_configs(ixia, cfg1, cfg2)
@@ -52,7 +58,8 @@ def test_stream_stats(ixia: IxeApp, locations: List[str]) -> None:
     """Test stream statistics."""
     print(test_stream_stats.__doc__)
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
     cfg1 = Path(__file__).parent.joinpath("configs/test_config_1.prt")
     cfg2 = Path(__file__).parent.joinpath("configs/test_config_2.prt")
     _load_configs(ixia, cfg1, cfg2)
@@ -81,7 +88,8 @@ def test_stream_stats(ixia: IxeApp, locations: List[str]) -> None:
 
 def test_capture(ixia: IxeApp, locations: List[str]) -> None:
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
     cfg1 = Path(__file__).parent.joinpath("configs/cap_config.prt")
     cfg2 = Path(__file__).parent.joinpath("configs/cap_config.prt")
     _load_configs(ixia, cfg1, cfg2)
@@ -112,11 +120,14 @@ def test_capture(ixia: IxeApp, locations: List[str]) -> None:
         print(name)
         print(port.cap_file_name)
         print(port.get_cap_file())
+        if port.cap_file_name:
+            assert len(list(ixia.session.read_cap_files(port)[port])) == num_packets[port]
 
 
-def test_capture_content(ixia: IxeApp, locations: List[str]) -> None:
+def test_capture_content(ixia: IxeApp, locations: List[str], tmp_path: Path) -> None:
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
 
     port1 = locations[0]
     port2 = locations[1]
@@ -141,10 +152,29 @@ def test_capture_content(ixia: IxeApp, locations: List[str]) -> None:
     assert "11 11 11 11 11 11" not in str(ixia.session.ports[port2].get_cap_frames(2))
     assert "22 22 22 22 22 22" in str(ixia.session.ports[port2].get_cap_frames(2))
 
+    frames = list(ixia.session.ports[port2].read_cap_frames())
+    assert len(frames) == ixia.session.ports[port2].capture.nPackets
+    assert bytes.fromhex("222222222222") in frames[-1].data
+    assert ixia.session.ports[port2].captureBuffer.windows
+
+    port2_buffer = ixia.session.ports[port2].captureBuffer
+    ixia.session.ports[port1].captureBuffer.load()
+    port2_buffer.getframe(1)
+    assert "22 22 22 22 22 22" in port2_buffer.frame
+
+    pcap_file = tmp_path.joinpath("capture.pcap")
+    assert ixia.session.ports[port2].save_cap_pcap(pcap_file) == len(frames)
+    assert pcap_file.stat().st_size > 24
+
+    columns = IxeCapColumns.from_port(ixia.session.ports[port2])
+    assert len(columns) == len(frames)
+    assert columns.sa()[-1] == 0x222222222222
+
 
 def test_long_capture(ixia: IxeApp, locations: List[str]) -> None:
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
     cfg1 = Path(__file__).parent.joinpath("configs/long_frame_config.prt")
     cfg2 = Path(__file__).parent.joinpath("configs/long_frame_config.prt")
     try:
@@ -311,7 +341,8 @@ def test_clear_all_stats(ixia: IxeApp, locations: List[str]) -> None:
 
 def _config_and_run_stream_stats_test(ixia: IxeApp, locations: List[str], rx_ports, sc=True, di=True, ts=True):
 
-    ixia.session.reserve_ports(locations, force=True)
+    ixia.session.add_ports(*locations)
+    ixia.session.reserve_ports(force=True)
 
     iteration = 1
     for port_name in locations:
@@ -341,3 +372,109 @@ def _config_and_run_stream_stats_test(ixia: IxeApp, locations: List[str], rx_por
     print(json.dumps(stream_stats.statistics, indent=1, sort_keys=True))
 
     return stream_stats.statistics
+
+
+def test_stats_delta(ixia: IxeApp, locations: List[str]) -> None:
+    """Test statistics deltas between reads."""
+    port1 = locations[0]
+    _config_and_run_stream_stats_test(ixia, locations, rx_ports=[])
+
+    port_delta = StatsDelta(IxePortsStats())
+    assert port_delta.read("framesSent")[(str(ixia.session.ports[port1]),)]["framesSent"] == 3
+    assert not port_delta.read("framesSent")
+
+    stream_delta = StatsDelta(IxeStreamsStats())
+    stream1 = ixia.session.ports[port1].streams[1]
+    assert stream_delta.read("framesSent")[(str(stream1), "tx")]["framesSent"] == 1
+    assert not stream_delta.read("framesSent")
+
+    ixia.session.clear_all_stats()
+    time.sleep(2)
+    assert not port_delta.read("framesSent")
+    assert not stream_delta.read("framesSent")
+
+
+def test_stats_sink(ixia: IxeApp, locations: List[str], tmp_path: Path) -> None:
+    """Test streaming statistics to file."""
+    _config_and_run_stream_stats_test(ixia, locations, rx_ports=[])
+
+    ports_stats = IxePortsStats()
+    with IxeStatsSink(tmp_path.joinpath("ports_stats.csv"), IxeStatsSinkFormat.csv) as ports_stats.sink:
+        ports_stats.read_stats("framesSent", "framesReceived")
+        ports_stats.read_stats("framesSent", "framesReceived")
+    lines = tmp_path.joinpath("ports_stats.csv").read_text().splitlines()
+    assert lines[0] == "timestamp,object,framesSent,framesReceived,framesSent_rate,framesReceived_rate"
+    assert len(lines) == 1 + 2 * len(ixia.session.ports)
+
+    ports_stats.sink = IxeStatsSink(tmp_path.joinpath("new_counters.csv"), IxeStatsSinkFormat.csv)
+    ports_stats.read_stats("framesSent")
+    ports_stats.read_stats("framesSent", "framesReceived")
+    ports_stats.sink.close()
+    # New counters rotate the file, so each file has a single header.
+    lines = tmp_path.joinpath("new_counters.csv.1").read_text().splitlines()
+    assert lines[0] == "timestamp,object,framesSent,framesSent_rate"
+    assert len(lines) == 1 + len(ixia.session.ports)
+    lines = tmp_path.joinpath("new_counters.csv").read_text().splitlines()
+    assert lines[0] == "timestamp,object,framesSent,framesSent_rate,framesReceived,framesReceived_rate"
+    assert len(lines) == 1 + len(ixia.session.ports)
+    with pytest.raises(RuntimeError):
+        ports_stats.read_stats("framesSent")
+
+    streams_stats = IxeStreamsStats()
+    with IxeStatsSink(tmp_path.joinpath("streams_stats.jsonl")) as streams_stats.sink:
+        streams_stats.read_stats()
+    snapshot = json.loads(tmp_path.joinpath("streams_stats.jsonl").read_text())
+    assert snapshot["statistics"] == json.loads(json.dumps(streams_stats.statistics))
+
+
+def test_stats_exporter(ixia: IxeApp, locations: List[str]) -> None:
+    """Test Prometheus statistics exporter."""
+    _config_and_run_stream_stats_test(ixia, locations, rx_ports=[])
+
+    ports_stats = IxePortsStats()
+    with IxeStatsExporter(ports_stats, IxeStreamsStats(), stats={ports_stats: ["framesSent"]}, port=0) as exporter:
+        assert ports_stats.api is exporter.api is not ixia.session.api
+        assert ixia.session.ports[locations[0]].read_stats("framesSent")["framesSent"] == 3
+        page = urllib.request.urlopen(f"http://127.0.0.1:{exporter.server_port}/metrics").read().decode()
+    assert ports_stats.api is None
+    port1 = ixia.session.ports[locations[0]]
+    assert f'ixexplorer_port_framesSent{{port="{port1}"}} 3' in page
+    assert "ixexplorer_stream_tx_framesSent{" in page
+    assert "ixexplorer_poll_error 0" in page
+
+
+def test_sync_stats(ixia: IxeApp, locations: List[str]) -> None:
+    """Test synchronized ports statistics."""
+    port1 = ixia.session.ports[locations[0]]
+    ports_stats = IxePortsStats()
+    ports_stats.enable_sync_stats(interval=100)
+    assert port1.enableTxRxSyncStatsMode or not port1.is_valid_feature("portFeatureTxRxSyncStats")
+    _config_and_run_stream_stats_test(ixia, locations, rx_ports=[])
+
+    sync_stats = ports_stats.read_stats("framesSent", "framesReceived", synchronized=True)
+    assert ports_stats.timestamp
+    assert sync_stats == ports_stats.read_stats("framesSent", "framesReceived")
+    assert sync_stats[str(port1)]["framesSent"] == 3
+
+
+def test_streams_summary(ixia: IxeApp, locations: List[str]) -> None:
+    """Test vectorized streams statistics summary."""
+    port1, port2 = locations
+    _config_and_run_stream_stats_test(ixia, locations, rx_ports=locations)
+
+    streams_stats = IxeStreamsStats()
+    summary = IxeStreamsSummary.from_view(streams_stats)
+    per_stream = summary.per_stream()
+    assert list(per_stream["tx_frames"]) == [1, 2, 3, 4]
+    assert list(per_stream["loss"]) == [0, 0, 0, 0]
+    tx_ports = dict(zip(summary.streams, summary.tx_ports))
+    statistics_summary = IxeStreamsSummary(streams_stats.read_stats("framesSent", "totalFrames"), tx_ports=tx_ports)
+    assert list(statistics_summary.per_stream()["rx_frames"]) == list(per_stream["rx_frames"])
+    assert list(statistics_summary.tx_ports) == list(summary.tx_ports)
+    assert summary.aggregate()["rx_frames"] == 10
+    port1_streams = summary.select(tx_ports=[ixia.session.ports[port1]], rx_ports=[ixia.session.ports[port2]])
+    assert port1_streams.aggregate()["tx_frames"] == 3
+    assert port1_streams.aggregate()["loss_percent"] == 0
+    assert len(summary.select(tx_ports=[ixia.session.ports[port2]])) == 2
+    assert list(summary.select(streams=summary.streams[0]).streams) == [summary.streams[0]]
+    assert len(summary.select(streams=list(summary.streams[2:]))) == 2